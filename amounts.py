@@ -0,0 +1,140 @@
+import re
+from dataclasses import dataclass
+import numpy as np
+
+# dashes and words used in statements for a zero amount
+ZERO_MARKERS = ["-", "–", "—", "nil", "n/a"]
+CURRENCY_MARKERS = ["$", "€", "£", "¥", "usd", "eur", "gbp", "chf"]
+# thousands separators that never act as decimal separators: spaces, no-break spaces and the swiss apostrophe
+GROUP_MARKERS = [" ", "\u00a0", "\u202f", "'", "’"]
+NEGATIVE_MARKERS = "-−–"
+# suffix multipliers of single amounts, longest first, e.g. "3.2m" or "1.5bn"
+SUFFIX_SCALES = [("bn", 1e9), ("mn", 1e6), ("k", 1e3), ("m", 1e6), ("b", 1e9)]
+# scale markers of table titles and headers, only explicit unit phrases: "in millions", "(thousands)",
+# "millions of euros", "€m", "EUR bn", "€'000" or "(000s)", never a bare "millions" of running text
+CURRENCY = r"(?:[€$£¥]|eur|usd|gbp|chf|euros?|dollars?|pounds?|francs?)"
+
+
+def _scale_pattern(words, abbreviations):
+    unit = rf"(?:{words})"
+    return re.compile(
+        rf"\bin\s+(?:{CURRENCY}\s*)?{unit}\b"
+        rf"|\(\s*(?:{CURRENCY}\s*)?{unit}\s*\)"
+        rf"|\b{unit}\s+of\s+{CURRENCY}"
+        rf"|(?<![a-z]){CURRENCY}\s?(?:{abbreviations})\b|\b(?:{abbreviations})\s?{CURRENCY}(?![a-z])",
+        re.IGNORECASE)
+
+
+SCALE_PATTERNS = [
+    (_scale_pattern(r"billions?|bn", r"bn|b"), 1e9),
+    (_scale_pattern(r"millions?|mn|mio", r"mn|mio|m"), 1e6),
+    (_scale_pattern(r"thousands?|000s?", r"k|'000|’000"), 1e3),
+    (re.compile(r"\(\s*000s?\s*\)|['’]000\b|\bteur\b|\btusd\b", re.IGNORECASE), 1e3),
+]
+# "1.234,5" and "1.234.567" only read as numbers with a decimal comma, "1,234.5" and "1,234,567" with a decimal point
+DECIMAL_COMMA_EVIDENCE = re.compile(r"\d,\d{1,2}$|\d\.\d{3}\.\d|\d\.\d{3},")
+DECIMAL_POINT_EVIDENCE = re.compile(r"\d\.\d{1,2}$|\d,\d{3},\d|\d,\d{3}\.")
+# an amount once stripped of its markers and separators, ASCII digits only
+NUMBER = re.compile(r"\d+\.?\d*|\.\d+", re.ASCII)
+# a single separator followed by exactly three digits, e.g. "1,234": a thousands group or a decimal, depending on the locale
+AMBIGUOUS_SEPARATOR = re.compile(r"^\(?[-−–]?\d{1,3}[.,]\d{3}\)?$")
+# confidence of a cell whose only separator is ambiguous and whose column gives no locale evidence,
+# below any acceptance threshold: read with the wrong locale the amount is off by a factor of 1000
+AMBIGUOUS_CONFIDENCE = 0.5
+
+
+@dataclass
+class ParsedColumn:
+    """
+    A column of amounts parsed at once.
+
+    values: float64 amounts, NaN for empty or unparseable cells.
+    confidence: per cell confidence in [0, 1], 0 for cells that are not amounts, 1 for empty cells.
+    decimal: the decimal separator the column was read with.
+    scale: the multiplier applied to every amount.
+    ambiguous: per cell flag of the amounts that read differently with the other locale, e.g. "12.345".
+    """
+    values: np.ndarray
+    confidence: np.ndarray
+    decimal: str
+    scale: float
+    ambiguous: np.ndarray
+
+    def to_list(self):
+        """The amounts as floats, None for empty or unparseable cells, e.g. to fill the statement models."""
+        return [None if np.isnan(value) else float(value) for value in self.values]
+
+
+def detect_scale(*texts):
+    """Returns the multiplier named by table titles or headers, e.g. 1000.0 for "(in thousands)", 1.0 when none is named."""
+    for text in texts:
+        for pattern, scale in SCALE_PATTERNS:
+            if text and pattern.search(text):
+                return scale
+    return 1.0
+
+
+def detect_decimal(cells):
+    """
+    Returns (decimal, certain): the decimal separator the amounts of the cells are written with,
+    decided by a vote of the unambiguous cells, and whether any cell gave evidence at all.
+    """
+    comma = sum(1 for cell in cells if DECIMAL_COMMA_EVIDENCE.search(cell))
+    point = sum(1 for cell in cells if DECIMAL_POINT_EVIDENCE.search(cell))
+    if comma > point:
+        return ",", True
+    return ".", point > 0
+
+
+def _strip_markers(column, markers):
+    for marker in markers:
+        column = np.char.replace(column, marker, "")
+    return column
+
+
+def parse_column(cells, decimal=None, scale=1.0):
+    """
+    Parses and scales a column of statement amounts, e.g. "(1,234)", "1.234,5", "—", "3.2m" or "€ 12 456".
+    decimal is detected from the column when not given, scale multiplies every amount.
+    """
+    raw = [cell if isinstance(cell, str) else "" for cell in cells]
+    certain = decimal is not None
+    if decimal is None:
+        decimal, certain = detect_decimal(raw)
+    column = np.char.lower(np.char.strip(np.asarray(raw, dtype=str).reshape(-1)))
+    if column.size == 0:
+        return ParsedColumn(np.zeros(0), np.zeros(0), decimal, scale, np.zeros(0, dtype=bool))
+    column = np.char.strip(np.char.replace(np.char.replace(column, "*", ""), "`", ""))
+
+    empty = column == ""
+    zero = np.isin(column, ZERO_MARKERS)
+    ambiguous = np.array([bool(AMBIGUOUS_SEPARATOR.match(cell)) for cell in column]) & (not certain)
+
+    column = _strip_markers(column, CURRENCY_MARKERS + GROUP_MARKERS)
+    negative = (np.char.startswith(column, "(") & np.char.endswith(column, ")"))
+    column = np.char.strip(column, "()")
+    for marker in NEGATIVE_MARKERS:
+        negative |= np.char.startswith(column, marker)
+    column = np.char.lstrip(column, NEGATIVE_MARKERS)
+
+    multiplier = np.ones(column.shape)
+    for suffix, suffix_scale in SUFFIX_SCALES:
+        suffixed = np.char.endswith(column, suffix) & (multiplier == 1)
+        multiplier[suffixed] = suffix_scale
+        column = np.where(suffixed, np.char.rstrip(column, "bmnk"), column)
+
+    thousands = "." if decimal == "," else ","
+    column = np.char.replace(column, thousands, "")
+    if decimal == ",":
+        column = np.char.replace(column, ",", ".")
+    # a number is ASCII digits with at most one decimal point, a footnote mark such as "¹" is a digit to str.isdigit
+    numeric = np.array([bool(NUMBER.fullmatch(cell)) for cell in column], dtype=bool) & ~empty & ~zero
+
+    values = np.full(column.shape, np.nan)
+    values[numeric] = column[numeric].astype(np.float64)
+    values = np.where(negative, -values, values) * multiplier * scale
+    values[zero] = 0.0
+
+    confidence = np.where(numeric | zero | empty, 1.0, 0.0)
+    confidence[numeric & ambiguous] = AMBIGUOUS_CONFIDENCE
+    return ParsedColumn(values, confidence, decimal, scale, numeric & ambiguous)
@@ -1,49 +1,169 @@
 from fastapi import FastAPI, Query, File, UploadFile, HTTPException
+from fastapi.responses import StreamingResponse
+from contextlib import asynccontextmanager
 from pyzerox import zerox
-from botocore.exceptions import NoCredentialsError, ClientError
+from pyzerox.processor import download_file, set_s3_client, close_http_session
+from pyzerox.processor.s3 import is_s3_uri, parse_s3_uri
+from botocore.exceptions import NoCredentialsError, ClientError, BotoCoreError
 import json
-from langchain_core.output_parsers import JsonOutputParser
+import re
+import logging
+import unicodedata
+import base64
+import hashlib
+import asyncio
+import dataclasses
+import aiofiles
 from langchain_core.prompts import ChatPromptTemplate
 import os
+import tempfile
+import shutil
 import misc
+import table_parser
+import schemas
+from pydantic import BaseModel, ValidationError
+from mapping_store import LabelMappingStore
+from matcher import FieldMatcher
+from catalog import CATALOGS, count_tokens
+from stage_cache import StageCache, file_digest
+from statements import build_statements
+from jobs import JobStore, JobQueue
+from singleflight import SingleFlight
+from s3_upload import upload_stream, presign_put, presign_multipart, object_digest, abort_stale_uploads
+from s3_listing import ListingCache, list_page, iter_objects
+from content_index import ContentIndex
+from prefetch import Prefetcher
 import statics as st
 from typing import Optional, List
 import prompts as prt
 from langchain_openai import ChatOpenAI
 
-os.environ["OPENAI_API_KEY"] = misc.get_apikey()
-model = ChatOpenAI(model='gpt-4', temperature=0)
-app = FastAPI()
+if "OPENAI_API_KEY" not in os.environ:
+    os.environ["OPENAI_API_KEY"] = misc.get_apikey()
+model = ChatOpenAI(model=st.TEXT_MODEL, temperature=0)
+logger = logging.getLogger(__name__)
 
-from fastapi import FastAPI
+job_queue = JobQueue(JobStore(st.JOB_STORE_PATH), workers=st.JOB_WORKERS)
 
-app = FastAPI()
+s3_client = None
 
-# Configure AWS S3
+def get_s3_client():
+    """
+    The S3 client shared by the requests and pyzerox s3:// downloads, created at startup, or on first use when
+    the credentials were not available yet.
+    """
+    global s3_client
+    if s3_client is None:
+        s3_client = misc.create_s3_client(st.PROFILE)
+        set_s3_client(s3_client)
+    return s3_client
+
+async def sweep_stale_uploads():
+    """Aborts the multipart uploads left unfinished, e.g. presigned ones the client never completed, periodically."""
+    while True:
+        try:
+            aborted = await asyncio.to_thread(abort_stale_uploads, get_s3_client(), st.S3_BUCKET_NAME,
+                                              st.S3_MULTIPART_MAX_AGE)
+            if aborted:
+                logger.info("Aborted %d stale multipart uploads: %s", len(aborted), aborted)
+        except (RuntimeError, BotoCoreError, ClientError):
+            logger.exception("Could not sweep the stale multipart uploads")
+        await asyncio.sleep(st.S3_MULTIPART_SWEEP_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app):
+    try:
+        get_s3_client()
+    except RuntimeError as e:
+        logger.warning("S3 client not created at startup: %s", e)
+    await job_queue.start()
+    sweeper = asyncio.create_task(sweep_stale_uploads())
+    yield
+    sweeper.cancel()
+    await job_queue.stop()
+    # the pooled connections of the URL downloads
+    await close_http_session()
+
+app = FastAPI(lifespan=lifespan)
+label_store = LabelMappingStore(st.LABEL_MAPPING_STORE_PATH)
+field_matchers = {statement: FieldMatcher(statement_catalog) for statement, statement_catalog in CATALOGS.items()}
+stage_cache = StageCache(st.STAGE_CACHE_DIR)
+TYPE_PROMPTS = {'income': prt.classify_income_type_prompt, 'balance': prt.classify_balance_type_prompt}
+CATEGORIES = {'income': st.INCOME_CATEGORIES, 'balance': st.BALANCE_CATEGORIES}
+OUTPUT_DIRS = {'income': "files/output/income-rep/", 'balance': "files/output/balance-rep/"}
+process_flights = SingleFlight()
+listing_cache = ListingCache(st.S3_LISTING_TTL, st.S3_LISTING_CACHE_PAGES)
+content_index = ContentIndex(st.CONTENT_INDEX_PATH)
+prefetcher = Prefetcher(st.PREFETCH_DIR)
+
+# the object keys of uploads: a base name of letters, digits, spaces and common punctuation
+UPLOAD_KEY = re.compile(r"[\w][\w .()+,=@-]{0,254}")
+
+def upload_key(filename):
+    """
+    The object key a file is uploaded under: its base name, normalized, the directories of the client dropped.
+    Raises a 400 for names that do not make a plain key, e.g. "..", control characters or wildcards.
+    """
+    name = unicodedata.normalize("NFC", filename or "").replace("\\", "/").rsplit("/", 1)[-1].strip()
+    if not UPLOAD_KEY.fullmatch(name):
+        raise HTTPException(status_code=400, detail=f"Invalid file name '{filename}'.")
+    return name
+
+def resolve_document(file_path):
+    """
+    Maps an s3:// URI of an uploaded document, possibly one of its aliases, to the stored object.
+    Returns (file_path, sha256), sha256 being None for documents that did not go through /upload/.
+    """
+    if not is_s3_uri(file_path):
+        return file_path, None
+    bucket, key = parse_s3_uri(file_path)
+    sha256 = content_index.digest_of(key) if bucket == st.S3_BUCKET_NAME else None
+    if sha256 is None:
+        return file_path, None
+    return f"s3://{bucket}/{content_index.lookup(sha256)['key']}", sha256
 
 @app.post("/upload/")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(
+        file: UploadFile = File(...),
+        prefetch: bool = Query(False, description="Render, extract and locate the pages in the background")):
     """
     Endpoint to upload a file to S3.
     :param file: The uploaded file from the client
+    :param prefetch: Queue the low priority pre-processing of the file, reused by /process-file
     """
-    session = misc.load_aws_credentials(st.PROFILE)
-    s3_client = session.client("s3")
-    print(session.profile_name)  # Should print 'ddtechu'
+    filename = upload_key(file.filename)
+
+    def skip(sha256):
+        # content that is already stored is only aliased, unless filename names another document: it is replaced
+        return content_index.lookup(sha256) is not None and content_index.digest_of(filename) in (None, sha256)
+
     try:
-        # Read file content
-        file_content = await file.read()
-        # Upload the file to S3
-        s3_client.put_object(
-            Bucket=st.S3_BUCKET_NAME,
-            Key=file.filename,
-            Body=file_content,
-            ContentType=file.content_type  # Set the correct content type (e.g., application/pdf)
-        )
+        # Stream the file to S3 in parts, with the correct content type (e.g., application/pdf)
+        digest = hashlib.sha256()
+        size, stored = await upload_stream(get_s3_client(), file, st.S3_BUCKET_NAME, filename, file.content_type,
+                                           part_size=st.S3_PART_SIZE, concurrency=st.S3_UPLOAD_CONCURRENCY,
+                                           digest=digest, skip=skip)
+        sha256 = digest.hexdigest()
+        if stored:
+            content_index.record(sha256, filename, size)
+            listing_cache.invalidate(filename)
+        else:
+            content_index.add_alias(sha256, filename)
+        await content_index.save()
+        key = content_index.lookup(sha256)["key"]
+        prefetch_job_id = None
+        if prefetch and not prefetcher.prefetched(sha256):
+            prefetch_job_id = job_queue.submit("prefetch", {"file_path": f"s3://{st.S3_BUCKET_NAME}/{key}", "sha256": sha256},
+                                               priority=st.PREFETCH_PRIORITY)
 
         return {
-            "message": f"File '{file.filename}' uploaded successfully to bucket '{st.S3_BUCKET_NAME}'",
-            "file_url": f"https://{st.S3_BUCKET_NAME}.s3.amazonaws.com/{file.filename}",
+            "message": f"File '{filename}' uploaded successfully to bucket '{st.S3_BUCKET_NAME}'" if stored
+                       else f"File '{filename}' is a copy of '{key}', recorded as an alias",
+            "file_url": f"https://{st.S3_BUCKET_NAME}.s3.amazonaws.com/{key}",
+            "s3_uri": f"s3://{st.S3_BUCKET_NAME}/{key}",
+            "sha256": sha256,
+            "duplicate": not stored,
+            "prefetch_job_id": prefetch_job_id,
         }
     except NoCredentialsError:
         raise HTTPException(status_code=500, detail="AWS credentials not found.")
@@ -51,36 +171,42 @@ async def upload_file(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/list-s3-buckets")
-async def list_s3_buckets():
+async def list_s3_buckets(
+        prefix: str = Query("", description="Only list the keys starting with this prefix"),
+        contains: Optional[str] = Query(None, description="Only list the keys containing this text"),
+        continuation_token: Optional[str] = Query(None, description="next_continuation_token of the previous page"),
+        max_keys: int = Query(1000, ge=1, le=1000, description="Keys read from S3 for this page")):
     """
-    Endpoint to list S3 buckets for a given AWS profile.
+    Endpoint to list one page of the objects of the bucket. The keys are filtered by contains after they are read,
+    so a page may hold fewer than max_keys keys while next_continuation_token is still set.
     """
     try:
-        # Load AWS credentials for the profile
-        session = misc.load_aws_credentials(st.PROFILE)
-
-        # Create S3 client using the loaded credentials
-        s3_client = session.client('s3')
-
-        # List buckets
-        # List objects in the bucket
-        response = s3_client.list_objects_v2(Bucket=st.S3_BUCKET_NAME)
-
-        # Extract object keys (blob names)
-        if 'Contents' in response:
-            blobs = [obj['Key'] for obj in response['Contents']]
-        else:
-            blobs = []
-        return {"blobs": blobs}
+        page = await list_page(get_s3_client(), listing_cache, st.S3_BUCKET_NAME, prefix, continuation_token, max_keys)
+        blobs = [obj['key'] for obj in page["objects"] if not contains or contains in obj['key']]
+        return {"blobs": blobs, "next_continuation_token": page["next_continuation_token"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/list-s3-buckets/stream")
+async def stream_s3_objects(
+        prefix: str = Query("", description="Only list the keys starting with this prefix"),
+        contains: Optional[str] = Query(None, description="Only list the keys containing this text")):
+    """
+    Streams every object of the bucket under prefix as newline delimited JSON, {"key", "size", "last_modified"}
+    per line, reading the listing page by page.
+    """
+    async def lines():
+        async for obj in iter_objects(get_s3_client(), st.S3_BUCKET_NAME, prefix, contains):
+            yield json.dumps(obj) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 async def process_file(file_path: str, model, output_dir, custom_system_prompt = None, select_pages = None, **kwargs):
     """
     Processes the given PDF file, converting it to markdown and saving the output.
     
     Args:
-        file_path (str): Path to the PDF file.
+        file_path (str): Local path, URL or s3://bucket/key URI of the PDF file.
         model: Model to use for processing.
         output_dir (str): Directory to save the consolidated markdown file.
         custom_system_prompt (str, optional): Custom prompt for zerox.
@@ -108,28 +234,257 @@ async def process_file(file_path: str, model, output_dir, custom_system_prompt =
     return result
 
 # Create a FastAPI route for the process_file function
+def output_dir_of(type_of_statement):
+    if type_of_statement not in OUTPUT_DIRS:
+        raise HTTPException(status_code=400, detail=f"Unknown type of statement '{type_of_statement}'.")
+    return OUTPUT_DIRS[type_of_statement]
+
+async def convert_document(type_of_statement, file_path, select_pages=None, locate=False, on_page=None):
+    """
+    Runs process_file on a document for /process-file, its stream and its jobs. Identical concurrent conversions,
+    same document content, pages, model, prompt and output directory, share one zerox run. The pages of a document
+    prefetched at upload are not rendered again, and with locate the pages its statement was located on are selected.
+    on_page is passed to zerox when this call runs the conversion, a call sharing one already in flight gets no pages.
+    Returns (result, shared), shared being whether the result came from a conversion already in flight.
+    """
+    output_dir = output_dir_of(type_of_statement)
+    file_path, sha256 = resolve_document(file_path)
+    manifest = await prefetcher.manifest(sha256) if sha256 else None
+    if locate and not select_pages and manifest:
+        select_pages = manifest["statements"][type_of_statement] or None
+
+    def conversion_key(digest):
+        return StageCache.key(digest, sorted(select_pages or []), st.VISION_MODEL, prt.pdf2json_omniai_prompt, output_dir)
+
+    def convert(path, **kwargs):
+        return process_file(
+            file_path=path,
+            model=st.VISION_MODEL,
+            output_dir=output_dir,
+            custom_system_prompt=prt.pdf2json_omniai_prompt,
+            select_pages=select_pages,
+            on_page=on_page,
+            **kwargs
+        )
+
+    images = prefetcher.page_images(manifest, select_pages) if manifest else None
+    if images is not None:
+        return await process_flights.do(conversion_key(sha256), lambda: convert(file_path, page_images=images))
+
+    # every caller downloads and hashes the document, the temporary copy is removed by the conversion using it
+    temp_dir = tempfile.mkdtemp()
+    started = False
+    try:
+        local_path = await download_file(file_path, temp_dir)
+        if not local_path:
+            raise HTTPException(status_code=404, detail=f"File '{file_path}' not found.")
+        key = conversion_key(await file_digest(local_path))
+
+        async def convert_download():
+            try:
+                return await convert(local_path)
+            finally:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+        def start():
+            nonlocal started
+            started = True
+            return convert_download()
+
+        return await process_flights.do(key, start)
+    finally:
+        if not started:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
 @app.get("/process-file")
 async def process_file_endpoint(
         type_of_statement: str,
-        file_path: str = Query(..., description="Path to the PDF file"),
-        select_pages : Optional[List[int]] = Query(None, description="List of page numbers to process")):
+        file_path: str = Query(..., description="Local path, URL or s3://bucket/key URI of the PDF file"),
+        select_pages : Optional[List[int]] = Query(None, description="List of page numbers to process"),
+        locate: bool = Query(False, description="Without select_pages, process the pages the statement was located on at upload")):
     """
     FastAPI endpoint to process a PDF file and return markdown content.
     """
-    if type_of_statement == 'income':
-        output_dir="files/output/income-rep/"
-    elif type_of_statement == 'balance':
-        output_dir="files/output/balance-rep/"
-    vision_model = "gpt-4o"
-    result = await process_file(
-        file_path=file_path,
-        model=vision_model,
-        output_dir=output_dir,
-        custom_system_prompt=prt.pdf2json_omniai_prompt,
-        select_pages=select_pages,
-    )
+    result, _ = await convert_document(type_of_statement, file_path, select_pages, locate)
     return {"result": result}
 
+@app.get("/metrics")
+async def metrics():
+    """
+    Request counters: how many /process-file conversions ran and how many requests shared one already in flight.
+    """
+    return {"process_file": process_flights.metrics()}
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.get("/process-file/stream")
+async def stream_process_file(
+        type_of_statement: str,
+        file_path: str = Query(..., description="Local path, URL or s3://bucket/key URI of the PDF file"),
+        select_pages : Optional[List[int]] = Query(None, description="List of page numbers to process"),
+        locate: bool = Query(False, description="Without select_pages, process the pages the statement was located on at upload")):
+    """
+    Streaming variant of /process-file: a server-sent "page" event with the markdown, token usage and completion time
+    of each page as soon as it completes, then a "summary" event with the totals of the document, or an "error" event.
+    A request joining the conversion of an identical one gets the page events at the end, without the per page usage.
+    """
+    output_dir_of(type_of_statement)
+    pages = asyncio.Queue()
+
+    async def on_page(page):
+        await pages.put(dataclasses.asdict(page))
+
+    async def convert():
+        result, shared = await convert_document(type_of_statement, file_path, select_pages, locate, on_page=on_page)
+        if shared:
+            # the conversion ran for an earlier request, its pages were streamed to that one
+            for page in result.pages:
+                pages.put_nowait({"page": page.page, "content": page.content})
+        # the pages were streamed already
+        return {field: value for field, value in dataclasses.asdict(result).items() if field != "pages"}
+
+    async def events():
+        task = asyncio.create_task(convert())
+        try:
+            while not (task.done() and pages.empty()):
+                getter = asyncio.ensure_future(pages.get())
+                await asyncio.wait([getter, task], return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield sse_event("page", getter.result())
+                else:
+                    getter.cancel()
+            if task.exception() is not None:
+                yield sse_event("error", {"detail": getattr(task.exception(), "detail", None) or repr(task.exception())})
+            else:
+                yield sse_event("summary", task.result())
+        finally:
+            # the client went away, the conversion stops unless another request waits for it
+            task.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+async def invoke_structured(prompt, inputs, schema):
+    """
+    Runs a single system prompt through the model in structured output mode and validates the answer
+    against the schema, a response model of schemas. A near-valid answer is repaired locally.
+    Returns (result, usage), usage holding the prompt and completion tokens reported by the model,
+    estimated from the prompt and answer text when the model reports none, and whether the answer was repaired.
+    """
+    prompt_value = ChatPromptTemplate.from_messages([("system", prompt)]).format_prompt(**inputs)
+    message = await model.bind(response_format=schemas.response_format(schema)).ainvoke(prompt_value)
+    tokens = getattr(message, "usage_metadata", None) or {
+        "input_tokens": count_tokens(prompt_value.to_string()),
+        "output_tokens": count_tokens(message.content)}
+    usage = {"prompt_tokens": tokens["input_tokens"], "completion_tokens": tokens["output_tokens"], "repaired": False}
+    try:
+        return schema.model_validate_json(message.content), usage
+    except ValidationError:
+        usage["repaired"] = True
+        return schema.model_validate(misc.repair_json(message.content)), usage
+
+async def index_statement(statement):
+    """
+    Indexes a raw statement by year. The markdown tables of the body are parsed locally,
+    the model only sees the statements whose tables do not parse.
+    Returns (json_stmnt, year_indexing, usage), usage being None when no model call was made.
+    """
+    if isinstance(statement, dict) and isinstance(statement.get("Body"), str):
+        json_stmnt = table_parser.index_years(statement["Body"], statement.get("Header"))
+        if json_stmnt is not None:
+            return json_stmnt, "table_parser", None
+    indexed, usage = await invoke_structured(prt.index_year_stmnt_prompt, {"financial_statement": statement},
+                                             schemas.YearIndexedStatement)
+    return indexed.to_legacy(), "model", usage
+
+async def classify_item_types(type_of_statement, downcased_stmnt):
+    """Classifies the items of a year indexed statement into the categories of the statement type, e.g. [{item: "earnings"}]."""
+    type_field_prompt = TYPE_PROMPTS[type_of_statement]
+    try:
+        item_types, _ = await invoke_structured(type_field_prompt, {"financial_statement": downcased_stmnt},
+                                                schemas.ITEM_TYPES[type_of_statement])
+    except (ValidationError, ValueError) as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    return item_types.to_legacy()
+
+async def map_fields(type_of_statement, types_items, top_k=st.MAPPING_TOP_K):
+    """
+    Maps the typed items of a statement to the known fields of its categories.
+    Returns (result, errors, mapping_stats): the {category}_mapping dicts, the failed categories and the resolution counts.
+    """
+    categories = CATEGORIES[type_of_statement]
+    statement_catalog = CATALOGS[type_of_statement]
+    field_matcher = field_matchers[type_of_statement]
+
+    # labels seen before are resolved from the learned store, confident lexical matches locally,
+    # only the ambiguous remainder costs a model call
+    learned = {category: {} for category in categories}
+    hits, local_matches, pruned, misses = 0, 0, 0, 0
+    calls = []
+    for category, fin_type in categories.items():
+        provided_items = misc.filter_keys_by_category(types_items, category)
+        known_names = statement_catalog.names(fin_type)
+        schema = schemas.FIELD_MAPPINGS[(type_of_statement, fin_type)]
+        with_candidates = {}
+        unknown_items = []
+        for label in provided_items:
+            field = label_store.lookup(type_of_statement, label, known_names)
+            if field is not None:
+                learned[category][label] = field
+                hits += 1
+                continue
+            match = field_matcher.match(label, fin_type)
+            if match is not None:
+                learned[category][label] = match.field
+                local_matches += 1
+                continue
+            # attach only the top-k most similar fields, terms without a plausible candidate see the whole catalog
+            candidates = field_matcher.candidates(label, fin_type, k=top_k) if top_k > 0 else []
+            if candidates and candidates[0].score >= st.MAPPING_MIN_CANDIDATE_SCORE:
+                with_candidates[label] = [c.field for c in candidates]
+            else:
+                unknown_items.append(label)
+        pruned += len(with_candidates)
+        misses += len(with_candidates) + len(unknown_items)
+        if with_candidates:
+            # every candidate description is sent once, however many terms share it
+            candidate_items = {field: field_matcher.compact[field]
+                               for fields in with_candidates.values() for field in fields}
+            calls.append((category, invoke_structured(prt.classify_fields_to_candidates_prompt, {
+                "unknown_financial_terms_with_candidates": with_candidates,
+                "candidate_known_items": candidate_items}, schema)))
+        if unknown_items:
+            calls.append((category, invoke_structured(prt.classify_fields_unknown_to_known_prompt, {
+                "unknown_financial_terms": unknown_items,
+                "known_financial_items": statement_catalog.prompt_fragments[fin_type]}, schema)))
+    # the mapping calls are independent, run them concurrently
+    responses = await misc.gather_bounded([call for _, call in calls], st.MAPPING_FANOUT)
+
+    result = {f'{category}_mapping': dict(learned[category]) for category in categories}
+    errors = {}
+    repaired = 0
+    for (category, _), response in zip(calls, responses):
+        if isinstance(response, Exception):
+            errors[category] = str(response)
+            continue
+        mappings, usage = response
+        repaired += usage["repaired"]
+        for label, field in mappings.to_legacy().items():
+            if field is not None:
+                label_store.record(type_of_statement, label, field)
+            result[f'{category}_mapping'][label] = field
+    if calls and all(isinstance(r, Exception) for r in responses):
+        raise HTTPException(status_code=502, detail=errors)
+    if any(not isinstance(r, Exception) for r in responses):
+        await label_store.save()
+
+    total = hits + local_matches + misses
+    mapping_stats = {"hits": hits, "local_matches": local_matches, "misses": misses,
+                     "pruned_prompts": pruned, "repaired_answers": repaired,
+                     "hit_rate": hits / total if total else None,
+                     "resolved_without_model": (hits + local_matches) / total if total else None}
+    return result, errors, mapping_stats
+
 # I would like to define an endpoint here that returns whether the fields are expenses or earnings
 @app.get("/retrieve_field_type_classification")
 async def retrieve_field_type_classification(
@@ -139,92 +494,468 @@ async def retrieve_field_type_classification(
         raw_stmnt_path=f"files/input/income-rep/{document_name}.md"
         clean_stmnt_path=f"files/input/income-rep/clean_{document_name}.json"
         type_stmnt_path=f"files/input/income-rep/type_{document_name}.json"
-        type_field_prompt = prt.classify_income_type_prompt
     elif type_of_statement == 'balance':
         raw_stmnt_path=f"files/input/balance-rep/{document_name}.md"
         clean_stmnt_path=f"files/input/balance-rep/clean_{document_name}.json"
         type_stmnt_path=f"files/input/balance-rep/type_{document_name}.json"
-        type_field_prompt = prt.classify_balance_type_prompt
-    jsonparser = JsonOutputParser()
-    index_year_stmnt_prompt = ChatPromptTemplate.from_messages([
-        ("system", prt.index_year_stmnt_prompt)])
-    with open(raw_stmnt_path, "r") as f:
-        chain = index_year_stmnt_prompt | model | jsonparser
-        statement= json.load(f)
-        json_stmnt = chain.invoke({"financial_statement": statement})
-        with open(clean_stmnt_path, "w") as writefile:
-            downcased_stmnt = misc.downcase_keys(json_stmnt)
-            json.dump(downcased_stmnt, writefile, indent=4)
-            classify_amount_type_prompt = ChatPromptTemplate.from_messages([
-                ("system", type_field_prompt)])
-            chain = classify_amount_type_prompt | model | jsonparser
-            type_fin_items = chain.invoke({"financial_statement": downcased_stmnt})
-            with open(type_stmnt_path, "w") as writefile:
-                json.dump(type_fin_items, writefile, indent=4)
-            return {"result": type_fin_items}
+    async with aiofiles.open(raw_stmnt_path, "r") as f:
+        statement = json.loads(await f.read())
+    try:
+        json_stmnt, year_indexing, _ = await index_statement(statement)
+    except (ValidationError, ValueError) as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    downcased_stmnt = misc.downcase_keys(json_stmnt)
+    async with aiofiles.open(clean_stmnt_path, "w") as writefile:
+        await writefile.write(json.dumps(downcased_stmnt, indent=4))
+    type_fin_items = await classify_item_types(type_of_statement, downcased_stmnt)
+    async with aiofiles.open(type_stmnt_path, "w") as writefile:
+        await writefile.write(json.dumps(type_fin_items, indent=4))
+    return {"result": type_fin_items, "year_indexing": year_indexing}
 
 @app.get("/retrieve_fields_classification")
 async def retrieve_field_classification(
         type_of_statement: str,
-        document_name:str):
+        document_name:str,
+        top_k: int = Query(st.MAPPING_TOP_K, description="Candidate fields attached to each term, 0 for the full catalog")):
     if type_of_statement == 'income':
         type_stmnt_path=f"files/input/income-rep/type_{document_name}.json"
-        known_fields = misc.retrieve_income_rep_fields()
     elif type_of_statement == 'balance':
         type_stmnt_path=f"files/input/balance-rep/type_{document_name}.json"
-        known_fields = misc.retrieve_balance_rep_fields()
     print(type_stmnt_path)
-    print(known_fields)
-    with open(type_stmnt_path,"r") as readfile:
-        types_items = json.load(readfile)
-        print(types_items)
-        if type_of_statement == 'income':
-            known_expense_items = []
-            known_earning_items = []
-            provided_expense_items = misc.filter_keys_by_category(types_items, 'expenses')
-            provided_earnings_items = misc.filter_keys_by_category(types_items, 'earnings')
-            income_fields = misc.retrieve_income_rep_fields()
-            for item, desc in income_fields.items():
-                if desc['fin_type'] == 'expense':
-                    known_expense_items.append((item, desc['description']))
-                elif desc['fin_type'] == 'earning':
-                    known_earning_items.append((item, desc['description']))
-            jsonparser = JsonOutputParser()
-            index_year_stmnt_prompt = ChatPromptTemplate.from_messages([
-                ("system", prt.classify_fields_unknown_to_known_prompt)])
-            chain = index_year_stmnt_prompt | model | jsonparser
-            expense_mapping_res = chain.invoke({"unknown_financial_terms": provided_expense_items,
-                                                "known_financial_items": known_expense_items})
-            earning_mapping_res = chain.invoke({"unknown_financial_terms": provided_earnings_items,
-                                                "known_financial_items": known_earning_items})
-            return {"result": {
-                'expenses_mapping': expense_mapping_res,
-                'earnings_mapping': earning_mapping_res}}
-        elif type_of_statement == 'balance':
-            known_asset_items = []
-            known_liability_items = []
-            known_equity_items = []
-            provided_asset_items = misc.filter_keys_by_category(types_items, 'asset')
-            provided_liability_items = misc.filter_keys_by_category(types_items, 'liability')
-            provided_equity_items = misc.filter_keys_by_category(types_items, 'equity')
-            for item, desc in known_fields.items():
-                if desc['fin_type'] == 'asset':
-                    known_asset_items.append((item, desc['description']))
-                elif desc['fin_type'] == 'liability':
-                    known_liability_items.append((item, desc['description']))
-                elif desc['fin_type'] == 'equity':
-                    known_equity_items.append((item, desc['description']))
-            jsonparser = JsonOutputParser()
-            unknown_to_known_prompt = ChatPromptTemplate.from_messages([
-                ("system", prt.classify_fields_unknown_to_known_prompt)])
-            chain = unknown_to_known_prompt | model | jsonparser
-            asset_mapping_res = chain.invoke({"unknown_financial_terms": provided_asset_items,
-                                                "known_financial_items": known_asset_items})
-            liability_mapping_res = chain.invoke({"unknown_financial_terms": provided_liability_items,
-                                                "known_financial_items": known_liability_items})
-            equity_mapping_res = chain.invoke({"unknown_financial_terms": provided_equity_items,
-                                                "known_financial_items": known_equity_items})
-            return {"result": {
-                'asset_mapping': asset_mapping_res,
-                'liability_mapping': liability_mapping_res,
-                'equity_mapping': equity_mapping_res}}
+    async with aiofiles.open(type_stmnt_path, "r") as readfile:
+        types_items = json.loads(await readfile.read())
+    print(types_items)
+    result, errors, mapping_stats = await map_fields(type_of_statement, types_items, top_k)
+    if errors:
+        return {"result": result, "errors": errors, "mapping_stats": mapping_stats}
+    return {"result": result, "mapping_stats": mapping_stats}
+
+@app.get("/classify_and_map_fields")
+async def classify_and_map_fields(
+        type_of_statement: str,
+        document_name: str):
+    """
+    Single pass alternative to /retrieve_field_type_classification followed by /retrieve_fields_classification:
+    one model call returns both the category and the known field of every item, validated against the field catalog.
+    """
+    if type_of_statement == 'income':
+        raw_stmnt_path=f"files/input/income-rep/{document_name}.md"
+        clean_stmnt_path=f"files/input/income-rep/clean_{document_name}.json"
+        type_stmnt_path=f"files/input/income-rep/type_{document_name}.json"
+        type_field_prompt = prt.classify_income_type_prompt
+        categories = st.INCOME_CATEGORIES
+    elif type_of_statement == 'balance':
+        raw_stmnt_path=f"files/input/balance-rep/{document_name}.md"
+        clean_stmnt_path=f"files/input/balance-rep/clean_{document_name}.json"
+        type_stmnt_path=f"files/input/balance-rep/type_{document_name}.json"
+        type_field_prompt = prt.classify_balance_type_prompt
+        categories = st.BALANCE_CATEGORIES
+    statement_catalog = CATALOGS[type_of_statement]
+    field_matcher = field_matchers[type_of_statement]
+    category_of = {fin_type: category for category, fin_type in categories.items()}
+
+    async with aiofiles.open(raw_stmnt_path, "r") as f:
+        statement = json.loads(await f.read())
+    try:
+        json_stmnt, year_indexing, index_usage = await index_statement(statement)
+    except (ValidationError, ValueError) as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    downcased_stmnt = misc.downcase_keys(json_stmnt)
+    async with aiofiles.open(clean_stmnt_path, "w") as writefile:
+        await writefile.write(json.dumps(downcased_stmnt, indent=4))
+
+    # every item once, with its amount of the first year it appears in as a hint of its sign
+    items = {}
+    for year_items in downcased_stmnt:
+        for amounts in year_items.values():
+            for label, amount in amounts.items():
+                items.setdefault(label, amount)
+
+    # items known from the learned store or matched locally take their category from the field
+    fields = {}
+    for label in items:
+        field = label_store.lookup(type_of_statement, label, statement_catalog.fields)
+        if field is None:
+            match = field_matcher.match(label)
+            field = match.field if match is not None else None
+        if field is not None and statement_catalog.fields[field].fin_type in category_of:
+            fields[label] = field
+    unknown_items = {label: amount for label, amount in items.items() if label not in fields}
+
+    usages = [index_usage] if index_usage else []
+    response = {}
+    if unknown_items:
+        known_by_category = "\n".join(f"{category}: {statement_catalog.compact_fragments.get(fin_type, '')}"
+                                      for category, fin_type in categories.items())
+        try:
+            classifications, usage = await invoke_structured(prt.classify_and_map_prompt, {
+                "categories": ", ".join(categories),
+                "financial_items": unknown_items,
+                "known_financial_items_by_category": known_by_category}, schemas.ITEM_CLASSIFICATIONS[type_of_statement])
+        except (ValidationError, ValueError) as e:
+            raise HTTPException(status_code=502, detail=str(e))
+        usages.append(usage)
+        response = classifications.to_legacy()
+
+    # the catalog is the source of truth: a known field decides the category, an unknown field is dropped
+    result = {f'{category}_mapping': {} for category in categories}
+    types_items = []
+    invalid_fields, corrected_categories = 0, 0
+    for label in items:
+        if label in fields:
+            field = fields[label]
+            category = category_of[statement_catalog.fields[field].fin_type]
+        else:
+            answer = response.get(label) or {}
+            category = answer.get("category") if answer.get("category") in categories else None
+            field = answer.get("field")
+            entry = statement_catalog.fields.get(field) if isinstance(field, str) else None
+            if entry is not None and entry.fin_type in category_of:
+                if category != category_of[entry.fin_type]:
+                    corrected_categories += 1
+                category = category_of[entry.fin_type]
+                label_store.record(type_of_statement, label, field)
+            else:
+                invalid_fields += field is not None
+                field = None
+        types_items.append({label: category})
+        if category is not None:
+            result[f'{category}_mapping'][label] = field
+    async with aiofiles.open(type_stmnt_path, "w") as writefile:
+        await writefile.write(json.dumps(types_items, indent=4))
+    if unknown_items:
+        await label_store.save()
+
+    # the three stage path: year indexing, the type prompt over the statement and one mapping prompt
+    # per category for the items neither learned nor matched locally
+    type_prompt_tokens = count_tokens(ChatPromptTemplate.from_messages([("system", type_field_prompt)]).format(
+        financial_statement=downcased_stmnt))
+    mapping_prompt = ChatPromptTemplate.from_messages([("system", prt.classify_fields_unknown_to_known_prompt)])
+    mapping_prompt_tokens = []
+    for category, fin_type in categories.items():
+        unknown_terms = [label for label in result[f'{category}_mapping'] if label in unknown_items]
+        if unknown_terms:
+            mapping_prompt_tokens.append(count_tokens(mapping_prompt.format(
+                unknown_financial_terms=unknown_terms,
+                known_financial_items=statement_catalog.prompt_fragments.get(fin_type, ""))))
+    prompt_tokens = sum(usage["prompt_tokens"] for usage in usages)
+    completion_tokens = sum(usage["completion_tokens"] for usage in usages)
+    usage = {"round_trips": len(usages),
+             "prompt_tokens": prompt_tokens,
+             "completion_tokens": completion_tokens,
+             "total_tokens": prompt_tokens + completion_tokens,
+             "repaired_answers": sum(usage["repaired"] for usage in usages),
+             "three_stage": {"round_trips": (index_usage is not None) + 1 + len(mapping_prompt_tokens),
+                             "prompt_tokens": (index_usage or {}).get("prompt_tokens", 0)
+                                              + type_prompt_tokens + sum(mapping_prompt_tokens)}}
+    return {"result": result, "types": types_items, "year_indexing": year_indexing, "usage": usage,
+            "validation": {"invalid_fields": invalid_fields, "corrected_categories": corrected_categories}}
+
+
+def statement_from_pages(pages):
+    """
+    Joins the financial statements found in the pages converted with pdf2json_omniai_prompt into one
+    {"Header": ..., "Body": ...} statement, the Header of the first one and the Bodies one after the other.
+    """
+    found = []
+    for content in pages:
+        try:
+            page = misc.repair_json(content or "")
+        except ValueError:
+            continue
+        if isinstance(page, dict):
+            found.extend(entry for entry in page.get("financial statements") or [] if isinstance(entry, dict))
+    if not found:
+        return None
+    return {"Header": found[0].get("Header", ""),
+            "Body": "\n\n".join(str(entry.get("Body", "")) for entry in found)}
+
+async def pipeline(type_of_statement, file_path, select_pages=None, top_k=st.MAPPING_TOP_K, report=None):
+    """
+    Runs a statement end to end: PDF to markdown, year indexed JSON, typed items, mapped fields and the populated
+    IncomeStatement or BalanceStatement of every year. Every stage is cached under its content hash, so a re-run
+    only recomputes the stages whose input, prompts or model changed.
+    report, when given, is called with the stage about to run, e.g. report(stage="markdown").
+    """
+    report = report or (lambda **progress: None)
+    if type_of_statement not in CATALOGS:
+        raise HTTPException(status_code=400, detail=f"Unknown type of statement '{type_of_statement}'.")
+    stages = {}
+
+    report(stage="markdown")
+
+    def markdown_key(document):
+        return StageCache.key(st.PIPELINE_CACHE_VERSION, document, st.VISION_MODEL, prt.pdf2json_omniai_prompt, select_pages)
+
+    # an uploaded document is known by its content hash, its cached markdown needs no download
+    file_path, document = resolve_document(file_path)
+    pages = await stage_cache.get("markdown", markdown_key(document)) if document else None
+    stages["markdown"] = pages is not None
+    if pages is None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            local_path = await download_file(file_path, temp_dir)
+            if not local_path:
+                raise HTTPException(status_code=404, detail=f"File '{file_path}' not found.")
+            document = await file_digest(local_path)
+
+            async def convert():
+                result = await process_file(file_path=local_path, model=st.VISION_MODEL, output_dir=None,
+                                            custom_system_prompt=prt.pdf2json_omniai_prompt, select_pages=select_pages)
+                return [page.content for page in result.pages]
+
+            pages, stages["markdown"] = await stage_cache.cached("markdown", markdown_key(document), convert)
+
+    statement = statement_from_pages(pages)
+    if statement is None:
+        raise HTTPException(status_code=422, detail="No financial statement found in the document.")
+
+    report(stage="year_indexed")
+
+    async def index():
+        json_stmnt, year_indexing, _ = await index_statement(statement)
+        return {"statement": misc.downcase_keys(json_stmnt), "year_indexing": year_indexing}
+
+    key = StageCache.key(st.PIPELINE_CACHE_VERSION, statement, st.TEXT_MODEL, prt.index_year_stmnt_prompt)
+    try:
+        indexed, stages["year_indexed"] = await stage_cache.cached("year_indexed", key, index)
+    except (ValidationError, ValueError) as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    downcased_stmnt = indexed["statement"]
+
+    report(stage="types")
+    key = StageCache.key(st.PIPELINE_CACHE_VERSION, downcased_stmnt, st.TEXT_MODEL, TYPE_PROMPTS[type_of_statement])
+    types_items, stages["types"] = await stage_cache.cached(
+        "types", key, lambda: classify_item_types(type_of_statement, downcased_stmnt))
+
+    report(stage="mappings")
+    # a mapping with failed categories is returned but not cached, the next run retries it
+    key = StageCache.key(st.PIPELINE_CACHE_VERSION, type_of_statement, types_items, st.TEXT_MODEL, top_k,
+                         prt.classify_fields_unknown_to_known_prompt, prt.classify_fields_to_candidates_prompt,
+                         dict(CATALOGS[type_of_statement].prompt_fragments))
+    mapped = await stage_cache.get("mappings", key)
+    stages["mappings"] = mapped is not None
+    errors = {}
+    if mapped is None:
+        result, errors, _ = await map_fields(type_of_statement, types_items, top_k)
+        mapped = result
+        if not errors:
+            await stage_cache.put("mappings", key, mapped)
+
+    report(stage="statements")
+    mapping = {label: field for category_mapping in mapped.values() for label, field in category_mapping.items()}
+    statements, statement_errors = build_statements(type_of_statement, downcased_stmnt, mapping)
+    response = {"document": document, "statements": statements, "mapping": mapped, "types": types_items,
+                "year_indexing": indexed["year_indexing"],
+                "stages": {stage: "cached" if hit else "computed" for stage, hit in stages.items()}}
+    if errors:
+        response["errors"] = errors
+    if statement_errors:
+        response["statement_errors"] = statement_errors
+    return response
+
+@app.get("/pipeline")
+async def run_pipeline(
+        type_of_statement: str,
+        file_path: str = Query(..., description="Local path, URL or s3://bucket/key URI of the PDF file"),
+        select_pages: Optional[List[int]] = Query(None, description="List of page numbers to process"),
+        top_k: int = Query(st.MAPPING_TOP_K, description="Candidate fields attached to each term, 0 for the full catalog")):
+    """
+    FastAPI endpoint running the whole pipeline within the request, see pipeline.
+    """
+    return await pipeline(type_of_statement, file_path, select_pages, top_k)
+
+async def process_file_job(report, type_of_statement, file_path, select_pages=None):
+    report(stage="markdown")
+    result, _ = await convert_document(type_of_statement, file_path, select_pages)
+    return dataclasses.asdict(result)
+
+async def prefetch_job(report, file_path, sha256):
+    """Speculatively renders, extracts and locates the pages of an uploaded document, see Prefetcher."""
+    manifest = await prefetcher.manifest(sha256)
+    if manifest is None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            report(stage="download")
+            local_path = await download_file(file_path, temp_dir)
+            manifest = await prefetcher.prepare(local_path, sha256, report)
+    return {"pages": len(manifest["images"]), "statements": manifest["statements"]}
+
+async def register_object(key, sha256, size, type_of_statement=None, prefetch=False):
+    """
+    Records an object uploaded straight to S3 in the content index, sha256 being the digest of the object
+    as verified by S3 or hashed by us, never one the client declared. A copy of a stored document is deleted
+    and recorded as an alias, then the pipeline of the document and its prefetch are queued when asked for.
+    """
+    entry = content_index.lookup(sha256)
+    duplicate = entry is not None and entry["key"] != key
+    content_index.record(sha256, key, size)
+    if duplicate:
+        await asyncio.to_thread(get_s3_client().delete_object, Bucket=st.S3_BUCKET_NAME, Key=key)
+    listing_cache.invalidate(key)
+    await content_index.save()
+    s3_uri = f"s3://{st.S3_BUCKET_NAME}/{content_index.lookup(sha256)['key']}"
+
+    jobs = {}
+    if type_of_statement:
+        jobs["pipeline"] = job_queue.submit("pipeline", {"type_of_statement": type_of_statement, "file_path": s3_uri})
+    if prefetch and not prefetcher.prefetched(sha256):
+        jobs["prefetch"] = job_queue.submit("prefetch", {"file_path": s3_uri, "sha256": sha256},
+                                            priority=st.PREFETCH_PRIORITY)
+    return {"s3_uri": s3_uri, "sha256": sha256, "duplicate": duplicate, "jobs": jobs}
+
+async def register_job(report, key, type_of_statement=None, prefetch=False):
+    """Hashes an object uploaded straight to S3 whose content S3 did not checksum, then registers it."""
+    report(stage="hash")
+    sha256, size = await object_digest(get_s3_client(), st.S3_BUCKET_NAME, key, st.S3_PART_SIZE)
+    report(stage="register")
+    return await register_object(key, sha256, size, type_of_statement, prefetch)
+
+job_queue.handlers.update({
+    "process-file": process_file_job,
+    "pipeline": lambda report, **params: pipeline(report=report, **params),
+    "prefetch": prefetch_job,
+    "register": register_job,
+})
+
+def submit_job(kind, type_of_statement, **params):
+    if type_of_statement not in CATALOGS:
+        raise HTTPException(status_code=400, detail=f"Unknown type of statement '{type_of_statement}'.")
+    job_id = job_queue.submit(kind, {"type_of_statement": type_of_statement, **params})
+    return {"job_id": job_id, "status": job_queue.store.get(job_id)["status"]}
+
+@app.post("/jobs/process-file")
+async def submit_process_file_job(
+        type_of_statement: str,
+        file_path: str = Query(..., description="Local path, URL or s3://bucket/key URI of the PDF file"),
+        select_pages: Optional[List[int]] = Query(None, description="List of page numbers to process")):
+    """
+    Queues the conversion of /process-file and returns its job id at once, the result is read from /jobs/{job_id}.
+    """
+    return submit_job("process-file", type_of_statement, file_path=file_path, select_pages=select_pages)
+
+@app.post("/jobs/pipeline")
+async def submit_pipeline_job(
+        type_of_statement: str,
+        file_path: str = Query(..., description="Local path, URL or s3://bucket/key URI of the PDF file"),
+        select_pages: Optional[List[int]] = Query(None, description="List of page numbers to process"),
+        top_k: int = Query(st.MAPPING_TOP_K, description="Candidate fields attached to each term, 0 for the full catalog")):
+    """
+    Queues a /pipeline run and returns its job id at once, the result is read from /jobs/{job_id}.
+    """
+    return submit_job("pipeline", type_of_statement, file_path=file_path, select_pages=select_pages, top_k=top_k)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    The status, progress and, once done, the result or error of a job.
+    """
+    job = job_queue.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    return job
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """
+    Cancels a queued or running job, e.g. a speculative prefetch that is no longer needed.
+    """
+    job = job_queue.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    if not job_queue.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job '{job_id}' is already {job['status']}.")
+    return {"job_id": job_id, "status": "cancelling" if job_id in job_queue.running else job_queue.store.get(job_id)["status"]}
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job(job_id: str):
+    """
+    Streams the job as server-sent events, one event per change, until it is done or failed.
+    """
+    if job_queue.store.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+
+    async def events():
+        async for job in job_queue.watch(job_id, st.JOB_POLL_INTERVAL):
+            yield sse_event(job["status"], job)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+async def object_exists(client, key):
+    try:
+        await asyncio.to_thread(client.head_object, Bucket=st.S3_BUCKET_NAME, Key=key)
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise HTTPException(status_code=500, detail=str(e))
+    return True
+
+@app.post("/uploads/presign")
+async def presign_upload(
+        filename: str,
+        size: int = Query(..., gt=0, description="Size of the file in bytes"),
+        content_type: str = Query("application/pdf", description="Content type of the file"),
+        sha256: Optional[str] = Query(None, pattern="^[0-9a-f]{64}$", description="Hex sha256 of the file, checked by S3")):
+    """
+    Issues the presigned URLs uploading a file straight to S3, without going through the API: a single PUT URL
+    for a file up to S3_PART_SIZE, otherwise the part URLs of a multipart upload. Once uploaded, the client
+    calls /uploads/complete. The file is only deduplicated there, once its content is verified, the declared
+    sha256 only makes S3 reject other content. A name already taken is refused with a 409.
+    """
+    filename = upload_key(filename)
+    client = get_s3_client()
+    if content_index.digest_of(filename) is not None or await object_exists(client, filename):
+        raise HTTPException(status_code=409, detail=f"'{filename}' already exists.")
+    try:
+        if size <= st.S3_PART_SIZE:
+            upload = {"mode": "put", **presign_put(client, st.S3_BUCKET_NAME, filename, content_type,
+                                                   st.S3_PRESIGN_EXPIRY, sha256)}
+        else:
+            upload = {"mode": "multipart", **await asyncio.to_thread(
+                presign_multipart, client, st.S3_BUCKET_NAME, filename, content_type, size, st.S3_PART_SIZE,
+                st.S3_PRESIGN_EXPIRY)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"key": filename, "expires_in": st.S3_PRESIGN_EXPIRY, **upload}
+
+class CompletedPart(BaseModel):
+    part_number: int
+    etag: str
+
+class UploadCompletion(BaseModel):
+    key: str
+    upload_id: Optional[str] = None
+    parts: List[CompletedPart] = []
+    type_of_statement: Optional[str] = None
+    prefetch: bool = False
+
+@app.post("/uploads/complete")
+async def complete_upload(completion: UploadCompletion):
+    """
+    Completion callback of a presigned upload: completes the multipart upload, registers the object in the
+    content index and queues its processing, the pipeline with type_of_statement and the prefetch with prefetch.
+    An object S3 checksummed with the sha256 given at presign time is registered at once, any other is hashed
+    by a "register" job first, whose id is returned.
+    """
+    if completion.type_of_statement and completion.type_of_statement not in CATALOGS:
+        raise HTTPException(status_code=400, detail=f"Unknown type of statement '{completion.type_of_statement}'.")
+    if upload_key(completion.key) != completion.key:
+        raise HTTPException(status_code=400, detail=f"Invalid key '{completion.key}'.")
+    client = get_s3_client()
+    try:
+        if completion.upload_id:
+            parts = [{"PartNumber": part.part_number, "ETag": part.etag}
+                     for part in sorted(completion.parts, key=lambda part: part.part_number)]
+            await asyncio.to_thread(client.complete_multipart_upload, Bucket=st.S3_BUCKET_NAME, Key=completion.key,
+                                    UploadId=completion.upload_id, MultipartUpload={"Parts": parts})
+        head = await asyncio.to_thread(client.head_object, Bucket=st.S3_BUCKET_NAME, Key=completion.key,
+                                       ChecksumMode="ENABLED")
+    except ClientError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    checksum = head.get("ChecksumSHA256")
+    # the checksum of a multipart upload, suffixed with its part count, is not the sha256 of the content
+    if checksum and "-" not in checksum:
+        return await register_object(completion.key, base64.b64decode(checksum).hex(), head["ContentLength"],
+                                     completion.type_of_statement, completion.prefetch)
+    job_id = job_queue.submit("register", {"key": completion.key, "type_of_statement": completion.type_of_statement,
+                                           "prefetch": completion.prefetch})
+    return {"s3_uri": f"s3://{st.S3_BUCKET_NAME}/{completion.key}", "register_job_id": job_id}
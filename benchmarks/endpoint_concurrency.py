@@ -0,0 +1,122 @@
+"""
+Benchmark showing that concurrent requests to the LLM backed endpoints overlap instead of serializing.
+
+The OpenAI chat model is replaced by a fake model that waits --latency seconds per call, so the
+benchmark runs offline. N concurrent requests should complete in roughly the time of one request,
+and a cheap request (/openapi.json) issued meanwhile should not wait for the LLM calls.
+
+    python benchmarks/endpoint_concurrency.py --requests 20 --latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import httpx
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+import app as fin_app
+
+DOCUMENT_NAME = "benchmark"
+STATEMENT = {"Header": "Income statement", "Body": "| | 2023 | 2022 |\n|---|---|---|\n| Revenue | 100 | 90 |\n| Cost of sales | (40) | (35) |"}
+
+
+def fake_model(latency: float) -> RunnableLambda:
+    """A chat model stand-in that answers every structured output call after `latency` seconds without blocking the event loop."""
+
+    answers = {
+        "YearIndexedStatement": {"amounts": [{"year": "2023", "item": "Revenue", "amount": 100},
+                                             {"year": "2023", "item": "Cost of sales", "amount": -40}]},
+        "ItemTypes": {"types": [{"item": "revenue", "category": "earnings"},
+                                {"item": "cost of sales", "category": "expenses"}]},
+        "FieldMappings": {"mappings": [{"term": "cost of sales", "field": "total_cogs"}]},
+        "ItemClassifications": {"items": [{"item": "cost of sales", "category": "expenses", "field": "total_cogs"}]},
+    }
+
+    def answer(prompt_value, response_format: dict = None) -> AIMessage:
+        name = response_format["json_schema"]["name"]
+        # the mapping schemas only enumerate the fields of one category
+        if name == "FieldMappings" and "total_cogs" not in json.dumps(response_format):
+            return AIMessage(content=json.dumps({"mappings": []}))
+        return AIMessage(content=json.dumps(answers[name]))
+
+    def invoke(prompt_value, **kwargs) -> AIMessage:
+        time.sleep(latency)
+        return answer(prompt_value, **kwargs)
+
+    async def ainvoke(prompt_value, **kwargs) -> AIMessage:
+        await asyncio.sleep(latency)
+        return answer(prompt_value, **kwargs)
+
+    return RunnableLambda(invoke, afunc=ainvoke)
+
+
+def prepare_inputs(work_dir: str) -> None:
+    input_dir = os.path.join(work_dir, "files", "input", "income-rep")
+    os.makedirs(input_dir, exist_ok=True)
+    with open(os.path.join(input_dir, f"{DOCUMENT_NAME}.md"), "w") as f:
+        json.dump(STATEMENT, f)
+
+
+async def timed_get(client: httpx.AsyncClient, url: str, params: dict = None) -> float:
+    start = time.perf_counter()
+    response = await client.get(url, params=params)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def run(n_requests: int, latency: float) -> bool:
+    transport = httpx.ASGITransport(app=fin_app.app)
+    params = {"type_of_statement": "income", "document_name": DOCUMENT_NAME}
+    ok = True
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for endpoint in ("/retrieve_field_type_classification", "/retrieve_fields_classification"):
+            # forget learned label mappings so that every request reaches the model
+            fin_app.label_store.mappings.clear()
+            single = await timed_get(client, endpoint, params)
+
+            fin_app.label_store.mappings.clear()
+            start = time.perf_counter()
+            requests = [asyncio.create_task(timed_get(client, endpoint, params)) for _ in range(n_requests)]
+            await asyncio.sleep(latency / 2)
+            probe = await timed_get(client, "/openapi.json")
+            await asyncio.gather(*requests)
+            wall = time.perf_counter() - start
+
+            overlap = (single * n_requests) / wall
+            print(f"{endpoint}")
+            print(f"  single request        : {single:.2f}s")
+            print(f"  {n_requests} concurrent requests : {wall:.2f}s (serial would be {single * n_requests:.2f}s, overlap x{overlap:.1f})")
+            print(f"  /openapi.json meanwhile: {probe * 1000:.1f}ms")
+
+            ok &= overlap > n_requests / 2 and probe < latency
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20, help="Number of concurrent requests per endpoint")
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated LLM latency per call, in seconds")
+    args = parser.parse_args()
+
+    fin_app.model = fake_model(args.latency)
+    with tempfile.TemporaryDirectory() as work_dir:
+        prepare_inputs(work_dir)
+        os.chdir(work_dir)
+        ok = asyncio.run(run(args.requests, args.latency))
+
+    print("requests overlap" if ok else "requests are serialized")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
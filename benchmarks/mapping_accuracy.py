@@ -0,0 +1,119 @@
+"""
+Benchmark of the top-k candidate pruning of the field mapping prompt against a small labeled set.
+
+Offline it reports the candidate recall@k of the local matcher (how often the correct field is
+among the candidates attached to a term) and, for the terms the matcher cannot resolve on its own
+(the ones the endpoint sends to the model), the prompt size of the full catalog prompt against
+the pruned candidates prompt. With --live both prompts are sent to the model and their accuracy
+and latency are compared.
+
+    python benchmarks/mapping_accuracy.py --top-k 5
+    python benchmarks/mapping_accuracy.py --top-k 5 --live
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT_DIR)
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from langchain_core.prompts import ChatPromptTemplate
+
+import app as fin_app
+from catalog import CATALOGS, count_tokens
+import prompts as prt
+import schemas
+import statics as st
+
+LABELED_SET = os.path.join(os.path.dirname(__file__), "data", "labeled_mappings.json")
+CATEGORIES = {"income": st.INCOME_CATEGORIES, "balance": st.BALANCE_CATEGORIES}
+
+
+def build_prompts(items: list, top_k: int) -> list:
+    """Returns (statement, category, full_inputs, pruned_inputs, items) per statement category of the labeled set."""
+    groups = {}
+    for item in items:
+        groups.setdefault((item["statement"], item["category"]), []).append(item)
+
+    batches = []
+    for (statement, category), group in groups.items():
+        fin_type = CATEGORIES[statement][category]
+        field_matcher = fin_app.field_matchers[statement]
+        # as in the endpoint, only the terms the matcher leaves unresolved reach the model
+        group = [item for item in group if field_matcher.match(item["label"], fin_type) is None]
+        if not group:
+            continue
+        labels = [item["label"] for item in group]
+        with_candidates = {}
+        for label in labels:
+            candidates = field_matcher.candidates(label, fin_type, k=top_k)
+            with_candidates[label] = [c.field for c in candidates]
+        candidate_items = {field: field_matcher.compact[field] for fields in with_candidates.values() for field in fields}
+        full_inputs = {"unknown_financial_terms": labels, "known_financial_items": CATALOGS[statement].prompt_fragments[fin_type]}
+        pruned_inputs = {"unknown_financial_terms_with_candidates": with_candidates, "candidate_known_items": candidate_items}
+        batches.append((statement, category, full_inputs, pruned_inputs, group))
+    return batches
+
+
+def candidate_recall(items: list, top_k: int) -> float:
+    found = 0
+    for item in items:
+        fin_type = CATEGORIES[item["statement"]][item["category"]]
+        candidates = fin_app.field_matchers[item["statement"]].candidates(item["label"], fin_type, k=top_k)
+        if item["field"] in {c.field for c in candidates}:
+            found += 1
+        else:
+            print(f"  missed: {item['label']!r} -> {item['field']} (candidates: {[c.field for c in candidates]})")
+    return found / len(items)
+
+
+async def run_live(batches: list) -> None:
+    prompts = {"full": prt.classify_fields_unknown_to_known_prompt, "pruned": prt.classify_fields_to_candidates_prompt}
+    for name, prompt in prompts.items():
+        correct, total, elapsed = 0, 0, 0.0
+        for statement, category, full_inputs, pruned_inputs, group in batches:
+            schema = schemas.FIELD_MAPPINGS[(statement, CATEGORIES[statement][category])]
+            start = time.perf_counter()
+            mappings, _ = await fin_app.invoke_structured(prompt, full_inputs if name == "full" else pruned_inputs, schema)
+            elapsed += time.perf_counter() - start
+            answer = mappings.to_legacy()
+            for item in group:
+                total += 1
+                correct += answer.get(item["label"]) == item["field"]
+        print(f"  {name:<6} prompt accuracy {correct / total:.0%}, {elapsed:.1f}s over {len(batches)} calls")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, default=st.MAPPING_TOP_K, help="Candidate fields attached to each term")
+    parser.add_argument("--labeled-set", default=LABELED_SET, help="JSON list of {statement, category, label, field}")
+    parser.add_argument("--live", action="store_true", help="Also send both prompts to the model and compare accuracy")
+    args = parser.parse_args()
+
+    with open(args.labeled_set, "r") as f:
+        items = json.load(f)
+
+    print(f"candidate recall@{args.top_k} over {len(items)} labels")
+    recall = candidate_recall(items, args.top_k)
+    print(f"  recall@{args.top_k}: {recall:.0%}")
+
+    batches = build_prompts(items, args.top_k)
+    full_prompt = ChatPromptTemplate.from_messages([("system", prt.classify_fields_unknown_to_known_prompt)])
+    pruned_prompt = ChatPromptTemplate.from_messages([("system", prt.classify_fields_to_candidates_prompt)])
+    full_tokens = sum(count_tokens(full_prompt.format(**full_inputs)) for _, _, full_inputs, _, _ in batches)
+    pruned_tokens = sum(count_tokens(pruned_prompt.format(**pruned_inputs)) for _, _, _, pruned_inputs, _ in batches)
+    print(f"prompt tokens over {len(batches)} calls, {sum(len(b[4]) for b in batches)} unresolved labels")
+    print(f"  full catalog : {full_tokens}")
+    print(f"  top-{args.top_k} pruned : {pruned_tokens} ({pruned_tokens / full_tokens:.0%} of full)")
+
+    if args.live:
+        print("live accuracy")
+        asyncio.run(run_live(batches))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import re
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Tuple
+import income_rep_model as im
+import balance_rep_model as bm
+
+# pydantic models whose fin_type annotated fields make up the known fields of each statement
+STATEMENT_MODELS = {
+    'income': (im.COGS, im.OperatingExpenses, im.IncomeStatement),
+    'balance': (bm.CurrentAssets, bm.LongTermAssets, bm.CurrentLiabilities, bm.LongTermLiabilities,
+                bm.Equity, bm.BalanceStatement),
+}
+# phrases in the Field descriptions that introduce alternative names of a field
+ALIAS_PATTERN = re.compile(
+    r"(?:also called|also known as|also referred to as|alternatively called|alternatively referred to as)\s+(.+?)(?:\.|$)",
+    re.IGNORECASE)
+# words of the description kept in the compact description of fields without aliases
+COMPACT_DESCRIPTION_WORDS = 12
+# encoding used to count prompt tokens, the count falls back to 4 characters per token without tiktoken
+TOKEN_ENCODING = "cl100k_base"
+
+
+def _load_encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception:
+        return None
+
+
+_encoding = _load_encoding()
+
+
+def count_tokens(text):
+    """Prompt size in tokens, approximated as 4 characters per token when the tiktoken encoding is unavailable."""
+    if _encoding is None:
+        return len(text) // 4
+    return len(_encoding.encode(text))
+
+
+def split_aliases(description):
+    """Returns the alternative names listed in a field description, e.g. "Also called finance costs or debt expenses."."""
+    return tuple(alias.strip() for group in ALIAS_PATTERN.findall(description)
+                 for alias in re.split(r"\s+or\s+", group) if alias.strip())
+
+
+def compact_description(description):
+    """
+    A short stand-in of a field description for prompts: its aliases when it lists some,
+    otherwise its first words without the "Expense:"-like prefix.
+    """
+    aliases = [group.strip() for group in ALIAS_PATTERN.findall(description)]
+    if aliases:
+        return "; ".join(aliases)
+    description = re.sub(r"^\w+:\s*", "", description)
+    words = description.split()
+    compact = " ".join(words[:COMPACT_DESCRIPTION_WORDS])
+    return compact if len(words) <= COMPACT_DESCRIPTION_WORDS else compact.rstrip(",;.") + "..."
+
+
+@dataclass(frozen=True)
+class FieldEntry:
+    name: str
+    description: str
+    fin_type: str
+    aliases: Tuple[str, ...]
+    compact: str
+
+
+@dataclass(frozen=True)
+class StatementCatalog:
+    """
+    The known fields of one statement type, indexed by fin_type, with the prompt fragments listing them.
+
+    prompt_fragments[fin_type] is the rendered known_financial_items of the full catalog mapping prompt,
+    prompt_tokens[fin_type] its size in tokens. compact_fragments[fin_type] lists the same fields with
+    their compact descriptions, for the classify and map prompt.
+    """
+    statement: str
+    fields: Mapping[str, FieldEntry]
+    by_fin_type: Mapping[str, Tuple[str, ...]]
+    prompt_fragments: Mapping[str, str]
+    prompt_tokens: Mapping[str, int]
+    compact_fragments: Mapping[str, str]
+
+    def names(self, fin_type):
+        """The field names of a fin_type, empty for an unknown fin_type."""
+        return self.by_fin_type.get(fin_type, ())
+
+    def known_fields(self):
+        """The fields as the {field: {'description': ..., 'fin_type': ...}} dict of misc.retrieve_*_rep_fields."""
+        return {name: {'description': entry.description, 'fin_type': entry.fin_type}
+                for name, entry in self.fields.items()}
+
+
+def build_catalog(statement, models):
+    fields = {}
+    for model_class in models:
+        for field_name, field_info in model_class.model_fields.items():
+            field_schema_extra = field_info.json_schema_extra or {}
+            if not field_schema_extra:
+                continue
+            description = field_info.description if field_info.description else 'No description'
+            fields[field_name] = FieldEntry(
+                name=field_name,
+                description=description,
+                fin_type=field_schema_extra.get('fin_type', 'Not specified'),
+                aliases=split_aliases(description),
+                compact=compact_description(description))
+
+    by_fin_type = {}
+    for entry in fields.values():
+        by_fin_type.setdefault(entry.fin_type, []).append(entry.name)
+    # rendered exactly as the prompt template renders a list of (name, description) tuples
+    prompt_fragments = {fin_type: str([(name, fields[name].description) for name in names])
+                        for fin_type, names in by_fin_type.items()}
+    return StatementCatalog(
+        statement=statement,
+        fields=MappingProxyType(fields),
+        by_fin_type=MappingProxyType({fin_type: tuple(names) for fin_type, names in by_fin_type.items()}),
+        prompt_fragments=MappingProxyType(prompt_fragments),
+        prompt_tokens=MappingProxyType({fin_type: count_tokens(fragment)
+                                        for fin_type, fragment in prompt_fragments.items()}),
+        compact_fragments=MappingProxyType({fin_type: str({name: fields[name].compact for name in names})
+                                            for fin_type, names in by_fin_type.items()}))
+
+
+CATALOGS = MappingProxyType({statement: build_catalog(statement, models)
+                             for statement, models in STATEMENT_MODELS.items()})
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timezone
+import misc
+
+
+class ContentIndex:
+    """
+    Persistent index of the uploaded documents by the sha256 of their content, so that a document uploaded
+    again under another name is recorded as an alias of the stored object instead of a new one. The sha256
+    is also the document digest of the pipeline stage cache, which links the aliases to the results.
+
+    Stored as {"version": 1, "documents": {"<sha256>": {"key": "report.pdf", "size": 123, "aliases": ["copy.pdf"],
+    "uploaded": "..."}}}, read and written with the JSON store helpers of misc.
+    """
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.documents = {}
+        # object key or alias -> sha256
+        self.keys = {}
+        self._lock = asyncio.Lock()
+        self.load()
+
+    def load(self):
+        data = misc.read_versioned_json(self.path, self.VERSION)
+        if data is not None:
+            self.documents = data.get("documents", {})
+        for digest, entry in self.documents.items():
+            for key in [entry["key"], *entry["aliases"]]:
+                self.keys[key] = digest
+
+    def lookup(self, digest):
+        """The entry of the document with this content, or None."""
+        return self.documents.get(digest)
+
+    def digest_of(self, key):
+        """The sha256 of the document stored or aliased under key, or None."""
+        return self.keys.get(key)
+
+    def _unlink(self, key):
+        """Forgets what key pointed to, e.g. before it is overwritten with other content."""
+        digest = self.keys.pop(key, None)
+        if digest is None:
+            return
+        entry = self.documents[digest]
+        if entry["key"] != key:
+            entry["aliases"].remove(key)
+            return
+        # the stored object itself is replaced, its aliases no longer point to its content
+        for alias in entry["aliases"]:
+            self.keys.pop(alias, None)
+        del self.documents[digest]
+
+    def record(self, digest, key, size):
+        """
+        Records that the object stored under key holds the content with this digest, replacing what key named
+        before. Content stored already makes key an alias of the stored document.
+        """
+        if self.keys.get(key) == digest:
+            return
+        self._unlink(key)
+        if digest in self.documents:
+            # stored twice, e.g. by concurrent uploads, the first stored object stays the canonical one
+            self.documents[digest]["aliases"].append(key)
+            self.keys[key] = digest
+            return
+        self.documents[digest] = {"key": key, "size": size, "aliases": [],
+                                  "uploaded": datetime.now(timezone.utc).isoformat()}
+        self.keys[key] = digest
+
+    def add_alias(self, digest, alias):
+        """
+        Records alias as another name of the stored document with this content. An alias never takes over a
+        name of another document, only record does, once the object under that name was verified.
+        """
+        if self.keys.get(alias) == digest:
+            return
+        if alias in self.keys:
+            raise ValueError(f"'{alias}' already names another document.")
+        self.documents[digest]["aliases"].append(alias)
+        self.keys[alias] = digest
+
+    async def save(self):
+        async with self._lock:
+            await misc.write_json_atomic(self.path, {"version": self.VERSION, "documents": self.documents}, indent=4)
@@ -361,11 +361,7 @@ class IncomeStatement(BaseModel):
 
     @root_validator(pre=False, skip_on_failure=True)
     def ensure_ebitda(cls, values) -> float:
-        print('before fetching EBIT')
-        print(values)
-        values = ensure_ebit(values ) if values.get('ebit') is None else values
-        print('after fetching EBIT')
-        print(values)
+        values = cls.ensure_ebit(values ) if values.get('ebit') is None else values
         # Calculate EBITDA if not provided
         if values.get('ebitda') is None:
             values['ebitda'] = (
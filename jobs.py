@@ -0,0 +1,208 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+
+# job states, done, failed and cancelled are final
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINAL_STATES = (DONE, FAILED, CANCELLED)
+# jobs of a lower priority value run first, speculative work uses a higher one
+DEFAULT_PRIORITY = 0
+JSON_COLUMNS = ("params", "progress", "result")
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    priority INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class JobStore:
+    """
+    The jobs and their state in a SQLite table, so that queued and interrupted jobs survive a restart.
+    params, progress and result are stored as JSON.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = None
+
+    @property
+    def connection(self):
+        """The database, opened on first use, so that creating the store, e.g. at import, touches no file."""
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # autocommit, every update is visible to the status endpoints at once
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(SCHEMA)
+            # stores created before jobs had a priority
+            columns = [row["name"] for row in connection.execute("PRAGMA table_info(jobs)")]
+            if "priority" not in columns:
+                connection.execute("ALTER TABLE jobs ADD COLUMN priority INTEGER NOT NULL DEFAULT 0")
+            self._connection = connection
+        return self._connection
+
+    def create(self, kind, params, priority=DEFAULT_PRIORITY):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self.connection.execute(
+            "INSERT INTO jobs (id, kind, params, status, priority, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(params), QUEUED, priority, now, now))
+        return job_id
+
+    def get(self, job_id):
+        """The job as a dict, None for an unknown id."""
+        row = self.connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for column in JSON_COLUMNS:
+            if job[column] is not None:
+                job[column] = json.loads(job[column])
+        return job
+
+    def update(self, job_id, **fields):
+        for column in JSON_COLUMNS:
+            if column in fields:
+                fields[column] = json.dumps(fields[column], default=str)
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        self.connection.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def unfinished(self):
+        """The (id, priority) of the queued and running jobs, oldest first."""
+        rows = self.connection.execute(
+            "SELECT id, priority FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)).fetchall()
+        return [(row["id"], row["priority"]) for row in rows]
+
+
+class JobQueue:
+    """
+    Runs the jobs of a JobStore on a bounded pool of asyncio workers.
+
+    handlers maps a job kind to the coroutine function running it, called as handler(report, **params).
+    report(**progress) records the progress of the job, e.g. report(stage="markdown"). The JSON
+    serializable return value of the handler is the job result, an exception fails the job.
+    Queued jobs start by priority, then in submission order. A job can be cancelled while queued or running.
+    """
+
+    def __init__(self, store, workers, handlers=None):
+        self.store = store
+        self.workers = workers
+        self.handlers = dict(handlers or {})
+        # jobs submitted before start() wait here until the workers run
+        self.queue = asyncio.PriorityQueue()
+        self.tasks = []
+        # job id -> task of the handler, for the jobs being run
+        self.running = {}
+        self.cancelled = set()
+        self.sequence = 0
+
+    async def start(self):
+        """Starts the workers, re-queuing the jobs left queued or running by the previous process."""
+        # the store holds the jobs submitted before the start too, they are queued again from it in order
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.queue.task_done()
+        for job_id, priority in self.store.unfinished():
+            self.store.update(job_id, status=QUEUED)
+            self._enqueue(job_id, priority)
+        self.tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Cancels the workers, the jobs they were running stay running in the store and are re-queued on start."""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def _enqueue(self, job_id, priority):
+        self.sequence += 1
+        self.queue.put_nowait((priority, self.sequence, job_id))
+
+    def submit(self, kind, params, priority=DEFAULT_PRIORITY):
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind '{kind}'.")
+        job_id = self.store.create(kind, params, priority)
+        self._enqueue(job_id, priority)
+        return job_id
+
+    def cancel(self, job_id):
+        """Cancels a queued or running job. Returns False when the job is unknown or already final."""
+        job = self.store.get(job_id)
+        if job is None or job["status"] in FINAL_STATES:
+            return False
+        task = self.running.get(job_id)
+        if task is not None:
+            self.cancelled.add(job_id)
+            task.cancel()
+        else:
+            # skipped by the worker that dequeues it
+            self.store.update(job_id, status=CANCELLED)
+        return True
+
+    async def watch(self, job_id, interval):
+        """Yields the job every time it changes, until it reaches a final state."""
+        updated_at = None
+        while True:
+            job = self.store.get(job_id)
+            if job is None:
+                return
+            if job["updated_at"] != updated_at:
+                updated_at = job["updated_at"]
+                yield job
+            if job["status"] in FINAL_STATES:
+                return
+            await asyncio.sleep(interval)
+
+    async def _work(self):
+        while True:
+            _, _, job_id = await self.queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job_id):
+        job = self.store.get(job_id)
+        if job is None or job["status"] in FINAL_STATES:
+            return
+        self.store.update(job_id, status=RUNNING, attempts=job["attempts"] + 1)
+
+        def report(**progress):
+            self.store.update(job_id, progress=progress)
+
+        task = asyncio.ensure_future(self.handlers[job["kind"]](report, **job["params"]))
+        self.running[job_id] = task
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if job_id not in self.cancelled:
+                # the queue is stopping, the job is re-queued on the next start
+                raise
+            self.store.update(job_id, status=CANCELLED)
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job_id, job["kind"])
+            self.store.update(job_id, status=FAILED, error=getattr(e, "detail", None) or repr(e))
+        else:
+            self.store.update(job_id, status=DONE, result=result)
+        finally:
+            self.running.pop(job_id, None)
+            self.cancelled.discard(job_id)
@@ -0,0 +1,50 @@
+import asyncio
+from datetime import datetime, timezone
+import misc
+
+
+class LabelMappingStore:
+    """
+    Persistent mapping from a normalized line-item label and statement type to a known field
+    of income_rep_model or balance_rep_model, learned from the LLM mapping answers.
+
+    The store is a versioned JSON file:
+        {"version": 1, "mappings": {"income": {"turnover": {"field": "revenue", "hits": 3, "updated": "..."}}}}
+    A file written by another version is ignored and rebuilt.
+    """
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.mappings = {}
+        self._lock = asyncio.Lock()
+        self.load()
+
+    def load(self):
+        data = misc.read_versioned_json(self.path, self.VERSION)
+        if data is not None:
+            self.mappings = data.get("mappings", {})
+
+    def lookup(self, type_of_statement, label, known_fields=None):
+        """
+        Returns the known field learned for the label, or None.
+        Fields no longer present in known_fields (when given) are treated as unknown.
+        """
+        entry = self.mappings.get(type_of_statement, {}).get(misc.normalize_label(label))
+        if entry is None:
+            return None
+        if known_fields is not None and entry["field"] not in known_fields:
+            return None
+        entry["hits"] += 1
+        return entry["field"]
+
+    def record(self, type_of_statement, label, field):
+        self.mappings.setdefault(type_of_statement, {})[misc.normalize_label(label)] = {
+            "field": field,
+            "hits": 0,
+            "updated": datetime.now(timezone.utc).isoformat(),
+        }
+
+    async def save(self):
+        async with self._lock:
+            await misc.write_json_atomic(self.path, {"version": self.VERSION, "mappings": self.mappings}, indent=4)
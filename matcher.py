@@ -0,0 +1,139 @@
+from collections import defaultdict
+from dataclasses import dataclass
+import misc
+
+# scores above this are resolved locally, provided the runner-up field is far enough behind
+MATCH_THRESHOLD = 0.85
+MATCH_MARGIN = 0.1
+# trigram similarity of two words for one to stand for the other in a fuzzy match, e.g. a misspelling
+WORD_SIMILARITY = 0.5
+# weight of the share of term words found in a field description, kept below MATCH_THRESHOLD so that
+# description overlap alone only ranks candidates and never resolves a term locally
+DESCRIPTION_WEIGHT = 0.6
+STOPWORDS = {"a", "an", "and", "as", "by", "for", "from", "in", "of", "on", "or", "the", "to", "with"}
+
+
+@dataclass
+class Match:
+    field: str
+    score: float
+    phrase: str
+
+
+def singularize(phrase):
+    """Crude plural folding so that "Revenues" and "Inventories" meet "revenue" and "inventory"."""
+    tokens = []
+    for token in phrase.split():
+        if len(token) > 4 and token.endswith("ies"):
+            token = token[:-3] + "y"
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return " ".join(tokens)
+
+
+def normalize_term(term):
+    return singularize(misc.normalize_label(term))
+
+
+def content_words(phrase):
+    return set(phrase.split()) - STOPWORDS
+
+
+def trigrams(phrase):
+    padded = f"  {phrase} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def dice(grams, other_grams):
+    return 2 * len(grams & other_grams) / (len(grams) + len(other_grams))
+
+
+def words_covered(words, other_words):
+    """Whether every word has a counterpart among other_words, the same word or a close spelling of it."""
+    return all(any(word == other or dice(trigrams(word), trigrams(other)) >= WORD_SIMILARITY for other in other_words)
+               for word in words)
+
+
+class FieldMatcher:
+    """
+    Local lexical/fuzzy matcher of unknown financial terms to the known fields of a statement.
+
+    Every field is indexed under its name and the aliases found in its description. A term is
+    resolved when its normalized form equals exactly one field phrase, or when its character
+    trigram similarity to a field phrase is high and clearly ahead of any other field.
+    """
+
+    def __init__(self, statement_catalog):
+        """statement_catalog: the catalog.StatementCatalog of the statement type."""
+        entries = statement_catalog.fields
+        self.fin_types = {field: entry.fin_type for field, entry in entries.items()}
+        self.compact = {field: entry.compact for field, entry in entries.items()}
+        self.description_words = {field: content_words(normalize_term(entry.description))
+                                  for field, entry in entries.items()}
+        self.exact = defaultdict(set)
+        self.phrases = []
+        self.postings = defaultdict(set)
+        for field, entry in entries.items():
+            names = {normalize_term(field.replace('_', ' '))} | {normalize_term(alias) for alias in entry.aliases}
+            names.discard("")
+            for phrase in names:
+                self.exact[phrase].add(field)
+                grams = trigrams(phrase)
+                self.phrases.append((phrase, field, grams))
+                for gram in grams:
+                    self.postings[gram].add(len(self.phrases) - 1)
+
+    def candidates(self, term, fin_type=None, k=5):
+        """Returns up to k (field, score, phrase) candidates for the term, best first, one per field."""
+        phrase = normalize_term(term)
+        grams = trigrams(phrase)
+        overlap = defaultdict(int)
+        for gram in grams:
+            for index in self.postings.get(gram, ()):
+                overlap[index] += 1
+
+        best = {}
+        for index, shared in overlap.items():
+            known_phrase, field, known_grams = self.phrases[index]
+            if fin_type is not None and self.fin_types[field] != fin_type:
+                continue
+            # dice coefficient of the trigram sets
+            score = 2 * shared / (len(grams) + len(known_grams))
+            if known_phrase == phrase:
+                score = 1.0
+            if field not in best or score > best[field][0]:
+                best[field] = (score, known_phrase)
+        # words of the term found in the description, e.g. "cost of goods" in "... the full Cost of Goods Sold."
+        words = content_words(phrase)
+        if words:
+            for field, description_words in self.description_words.items():
+                if fin_type is not None and self.fin_types[field] != fin_type:
+                    continue
+                score = DESCRIPTION_WEIGHT * len(words & description_words) / len(words)
+                if score > 0 and (field not in best or score > best[field][0]):
+                    best[field] = (score, phrase)
+        ranked = sorted(best.items(), key=lambda item: item[1][0], reverse=True)
+        return [Match(field, score, known_phrase) for field, (score, known_phrase) in ranked[:k]]
+
+    def match(self, term, fin_type=None):
+        """Returns the Match when the term resolves confidently to a single field, None when it is ambiguous."""
+        phrase = normalize_term(term)
+        exact = {field for field in self.exact.get(phrase, ())
+                 if fin_type is None or self.fin_types[field] == fin_type}
+        if len(exact) == 1:
+            return Match(exact.pop(), 1.0, phrase)
+        if len(exact) > 1:
+            return None
+
+        candidates = self.candidates(term, fin_type, k=2)
+        if not candidates or candidates[0].score <= MATCH_THRESHOLD:
+            return None
+        if len(candidates) > 1 and candidates[0].score - candidates[1].score < MATCH_MARGIN:
+            return None
+        # a qualifier on either side changes the item, e.g. "other operating income" is not "operating income"
+        # and "other current assets" not "other non current assets", these are left to the model
+        words, matched_words = content_words(phrase), content_words(candidates[0].phrase)
+        if not (words_covered(words, matched_words) and words_covered(matched_words, words)):
+            return None
+        return candidates[0]
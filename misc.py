@@ -1,37 +1,30 @@
-import income_rep_model as im
-import balance_rep_model as bm
+import asyncio
+import json
+import re
+import catalog
 import netrc
 import os
+import uuid
+import aiofiles
 import statics as st
 import configparser
 import boto3
+from botocore.config import Config
 
-def load_aws_credentials(profile):
+def create_s3_client(profile):
     """
-    Loads AWS credentials and region for a given profile into environment variables.
+    Creates the long-lived S3 client of the process for a given profile, without touching the environment.
+    botocore refreshes the profile's credentials itself when they expire, e.g. for assumed roles or SSO.
     """
     try:
-        # Load the profile using boto3.Session
         session = boto3.Session(profile_name=profile)
-
-        # Get credentials and region
         credentials = session.get_credentials()
-        region = session.region_name
-
-        # Ensure all required fields are present
-        if not credentials or not credentials.access_key or not credentials.secret_key or not region:
-            raise ValueError("Missing AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, " +
-                             "or AWS_DEFAULT_REGION in the credentials file.")
-
-        # Set environment variables
-        os.environ["AWS_ACCESS_KEY_ID"] = credentials.access_key
-        os.environ["AWS_SECRET_ACCESS_KEY"] = credentials.secret_key
-        os.environ["AWS_DEFAULT_REGION"] = region
-
-        print("AWS credentials successfully loaded.")
-        return session
+        if not credentials or not session.region_name:
+            raise ValueError("Missing AWS credentials or region for the profile.")
+        config = Config(max_pool_connections=st.S3_MAX_POOL_CONNECTIONS)
+        return session.client("s3", endpoint_url=st.S3_ENDPOINT_URL, config=config)
     except Exception as e:
-        raise RuntimeError(f"An error occurred while loading AWS credentials: {e}")
+        raise RuntimeError(f"An error occurred while creating the S3 client: {e}")
 
 def get_apikey():
     # Path to the authinfo file (default is ~/.netrc or ~/.authinfo)
@@ -52,37 +45,12 @@ def get_apikey():
         raise RuntimeError(f"An error occurred while reading the authinfo file: {e}")
 
 def retrieve_income_rep_fields():
-    print('enter retrieve_income_rep')
-    # create a dict with the field and it's description
-    st_income_fields = {}
-    fields = im.COGS.__fields__ | im.OperatingExpenses.__fields__ | im.IncomeStatement.__fields__
-    for field_name, field_info in fields.items():
-        field_info = field_info
-        description = field_info.description if field_info.description else 'No description'
-        field_schema_extra = field_info.json_schema_extra or {}
-        if not field_schema_extra:
-            continue
-        fin_type = field_schema_extra.get('fin_type', 'Not specified')
-        st_income_fields[field_name] = {'description': description,
-                                        'fin_type': fin_type}
-    print(st_income_fields)
-    return st_income_fields
+    # the field and it's description, from the catalog built at import
+    return catalog.CATALOGS['income'].known_fields()
 
 def retrieve_balance_rep_fields():
-    print('enter retrieve_balance_rep')
-    # create a dict with the field and it's description
-    st_balance_fields = {}
-    fields = bm.CurrentAssets.__fields__ | bm.LongTermAssets.__fields__ | bm.CurrentLiabilities.__fields__ | bm.LongTermLiabilities.__fields__ | bm.Equity.__fields__ | bm.BalanceStatement.__fields__
-    for field_name, field_info in fields.items():
-        field_info = field_info
-        description = field_info.description if field_info.description else 'No description'
-        field_schema_extra = field_info.json_schema_extra or {}
-        if not field_schema_extra:
-            continue
-        fin_type = field_schema_extra.get('fin_type', 'Not specified')
-        st_balance_fields[field_name] = {'description': description,
-                                         'fin_type': fin_type}
-    return st_balance_fields
+    # the field and it's description, from the catalog built at import
+    return catalog.CATALOGS['balance'].known_fields()
 
 
 def downcase_keys(obj):
@@ -96,6 +64,15 @@ def downcase_keys(obj):
         # For other data types, return the object as-isb
         return obj
 
+def normalize_label(label):
+    """
+    Normalizes a financial line-item label so that spelling variants share one key,
+    e.g. "Trade & other receivables:" -> "trade and other receivables".
+    """
+    label = label.lower().replace("&", " and ")
+    label = re.sub(r"[^a-z0-9]+", " ", label)
+    return " ".join(label.split())
+
 def filter_keys_by_category(data, category):
     """
     Filters the keys in the given JSON data based on the specified category.
@@ -111,3 +88,95 @@ def filter_keys_by_category(data, category):
         return [key for item in data for key, value in item.items() if value is None]
     
     return [key for item in data for key, value in item.items() if value == category]
+
+
+async def gather_bounded(coroutines, limit):
+    """
+    Runs the coroutines concurrently with at most `limit` of them in flight.
+
+    Returns:
+        list: The results in the order of the coroutines. A failed coroutine yields its exception instead of a result.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*[run(c) for c in coroutines], return_exceptions=True)
+
+
+def repair_json(text, max_chars=st.JSON_REPAIR_MAX_CHARS):
+    """
+    Parses near-valid JSON answers of the model locally instead of paying for a retry: code fences,
+    text around the JSON, trailing commas, Python literals, single quotes and a truncated end.
+    The repair is bounded: texts longer than max_chars and anything still invalid after the fixes raise ValueError.
+    """
+    if len(text) > max_chars:
+        raise ValueError(f"Answer of {len(text)} characters is too long to repair.")
+    text = re.sub(r"^```(?:json)?|```$", "", text.strip()).strip()
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        raise ValueError("Answer holds no JSON object or array.")
+    text = text[min(starts):]
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    text = re.sub(r"\bNone\b", "null", re.sub(r"\bTrue\b", "true", re.sub(r"\bFalse\b", "false", text)))
+    if '"' not in text:
+        text = text.replace("'", '"')
+    # close the strings, objects and arrays left open by a truncated answer
+    closers, in_string, escaped = [], False, False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]" and closers:
+            closers.pop()
+    if in_string:
+        text += '"'
+    text = re.sub(r",\s*$", "", text)
+    if re.search(r":\s*$", text):
+        text += "null"
+    text += "".join(reversed(closers))
+    text = re.sub(r",\s*([}\]])", r"\1", text)
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Answer is not repairable JSON: {e}")
+
+
+def read_versioned_json(path, version):
+    """
+    The data of a JSON file {"version": ..., ...} of the stores, None when the file is missing or was written
+    by another version, the store is then rebuilt.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        data = json.load(f)
+    return data if data.get("version") == version else None
+
+
+async def write_json_atomic(path, data, indent=None):
+    """
+    Writes data as JSON to a unique temporary file that then replaces path at once, so a crash never leaves
+    a truncated file behind and concurrent writers of the same path never interleave.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    async with aiofiles.open(tmp_path, "w") as f:
+        await f.write(json.dumps(data, indent=indent))
+    os.replace(tmp_path, path)
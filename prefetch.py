@@ -0,0 +1,113 @@
+import asyncio
+import json
+import os
+import re
+import shutil
+import aiofiles
+from PyPDF2 import PdfReader
+import misc
+from pyzerox.constants import PDFConversionDefaultOptions
+from pyzerox.processor import convert_pdf_to_images, detect_image_format
+
+# titles whose presence in the text layer of a page locates a statement on it
+STATEMENT_TITLES = {
+    'income': re.compile(r"income statement|statement of (?:comprehensive )?income|profit (?:and|or|&) loss"
+                         r"|statement of operations|statement of earnings", re.IGNORECASE),
+    'balance': re.compile(r"balance sheet|statement of financial position|statement of financial condition",
+                          re.IGNORECASE),
+}
+# the statements themselves are tables, pages with fewer amounts only mention them, e.g. the table of contents
+MIN_PAGE_AMOUNTS = 10
+AMOUNT_PATTERN = re.compile(r"\(?\d{1,3}(?:[.,' ]\d{3})+\)?|\(?\d+[.,]\d+\)?")
+MANIFEST = "manifest.json"
+TEXT = "text.json"
+
+
+def extract_text(local_path):
+    """The text layer of every page of a PDF, empty strings for scanned pages."""
+    reader = PdfReader(local_path)
+    return [page.extract_text() or "" for page in reader.pages]
+
+
+def locate_statements(texts):
+    """
+    Returns {statement: [page numbers]}, the 1-indexed pages whose text layer names the statement
+    and holds enough amounts to be the statement itself.
+    """
+    located = {statement: [] for statement in STATEMENT_TITLES}
+    for number, text in enumerate(texts, start=1):
+        if len(AMOUNT_PATTERN.findall(text)) < MIN_PAGE_AMOUNTS:
+            continue
+        for statement, title in STATEMENT_TITLES.items():
+            if title.search(text):
+                located[statement].append(number)
+    return located
+
+
+class Prefetcher:
+    """
+    Artifacts of the speculative pre-processing of an uploaded document, under root/<sha256>/: the page images
+    rendered with the zerox defaults, the text layer of the pages and the pages the statements were located on.
+    The manifest only holds the paths of the artifacts, relative to the directory, and the located pages:
+        {"sha256": "...", "images": ["page_1.png"], "text": "text.json", "statements": {"income": [3]}}
+    It is written last, a document without one was not prefetched, or only partly.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def directory(self, sha256):
+        return os.path.join(self.root, sha256)
+
+    def prefetched(self, sha256):
+        return os.path.exists(os.path.join(self.directory(sha256), MANIFEST))
+
+    async def manifest(self, sha256):
+        """The manifest of a prefetched document, None when it was not prefetched."""
+        path = os.path.join(self.directory(sha256), MANIFEST)
+        if not os.path.exists(path):
+            return None
+        async with aiofiles.open(path, "r") as f:
+            return json.loads(await f.read())
+
+    def page_images(self, manifest, select_pages=None):
+        """The paths of the rendered pages to process, all of them or the select_pages ones, None when not available."""
+        if not manifest["images"]:
+            return None
+        images = [os.path.join(self.directory(manifest["sha256"]), image) for image in manifest["images"]]
+        if select_pages is None:
+            return images
+        if any(page < 1 or page > len(images) for page in select_pages):
+            return None
+        return [images[page - 1] for page in sorted(select_pages)]
+
+    async def prepare(self, local_path, sha256, report):
+        """Renders, extracts and locates the pages of a document, unless it was prefetched already. Returns the manifest."""
+        manifest = await self.manifest(sha256)
+        if manifest is not None:
+            return manifest
+        directory = self.directory(sha256)
+        # leftovers of a cancelled or interrupted prefetch
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+        images, texts = [], []
+        # image uploads are rendered by zerox itself and have no text layer
+        if not await asyncio.to_thread(detect_image_format, local_path):
+            report(stage="rasterize")
+            paths = await convert_pdf_to_images(image_density=PDFConversionDefaultOptions.DPI,
+                                                image_height=PDFConversionDefaultOptions.SIZE,
+                                                local_path=local_path, temp_dir=directory,
+                                                image_format=PDFConversionDefaultOptions.FORMAT)
+            if paths is None:
+                raise RuntimeError(f"Could not render the pages of '{local_path}'.")
+            images = [os.path.relpath(path, directory) for path in paths]
+            report(stage="text")
+            texts = await asyncio.to_thread(extract_text, local_path)
+            await misc.write_json_atomic(os.path.join(directory, TEXT), texts)
+
+        report(stage="locate")
+        manifest = {"sha256": sha256, "images": images, "text": TEXT if texts else None,
+                    "statements": locate_statements(texts)}
+        await misc.write_json_atomic(os.path.join(directory, MANIFEST), manifest)
+        return manifest
@@ -1,34 +1,34 @@
 index_year_stmnt_prompt = """
-Transform the the financial statement between triple backticks in JSON format. If the financial statement input is not a JSON, respond with: "Please provide a JSON input!"
+Extract the amounts of the financial statement between triple backticks.
 
     ```{financial_statement}``
 
-1. Consider only the "Body" key of the input json and create a list of jsons where the year is the key.
-2. For each year key, the output should be a json object with the name financial item name as key, and the correspondent number amount as value. The year should be an integer value like 1998, 202', or 2000. The values should always be a number with it's respective sign. Try to deduce if the value if positive or negative and assign the correct sign.
-3. If it's not possible to assign a number assign the json null value. 
-4. Return nothing but a json containing a list of jsons with every year present in the body as a key. Ensure that all the years within the body section are present and contain the JSON value as described in steps 1 and 2.
+1. Consider only the "Body" key of the input json.
+2. Give one amount entry for each financial item and each year of the body, with the financial item name, the year as four digits like 1998, 2020, or 2000, and the amount. The amounts should always be a number with it's respective sign. Try to deduce if the value if positive or negative and assign the correct sign.
+3. If it's not possible to assign a number assign the null amount.
+4. Ensure that all the years within the body section are present.
 """
 
 classify_income_type_prompt = """
-Transform the the financial statement between triple backticks in JSON format. If the financial statement input is not a JSON, respond with: "Please provide a JSON input!"
+Classify the items of the financial statement between triple backticks.
 
     ```{financial_statement}``
 
 
-1. For each different item classify if it is earnings or expense, using firstly the meaning, the sign if available, and the items before and after.
-2. Return should be ONLY a list of JSON objects. Each object should contain a single pair consisting of the  item's name, and either "earnings" or  "expenses". 
-3. Try to classify all of the financial items! If it is absolutely not possible to classify the key assign the json "null" value.
+1. For each different item classify if it is earnings or expenses, using firstly the meaning, the sign if available, and the items before and after.
+2. Give one entry per item with the item's name and its category.
+3. Try to classify all of the financial items! If it is absolutely not possible to classify the item assign the null category.
 """
 
 classify_balance_type_prompt = """
-Transform the the financial statement between triple backticks in JSON format. If the financial statement input is not a JSON, respond with: "Please provide a JSON input!"
+Classify the items of the financial statement between triple backticks.
 
     ```{financial_statement}``
 
 
 1. For each different item classify if it is an asset, liability, or equity, using firstly the meaning, the sign if available, and the items before and after.
-2. Return should be ONLY a list of JSON objects. Each object should contain a single pair consisting of the  item's name, and either "asset",  or  "expenses". 
-3. Try to classify all of the financial items! If it is absolutely not possible to classify the key assign the json "null" value.
+2. Give one entry per item with the item's name and its category.
+3. Try to classify all of the financial items! If it is absolutely not possible to classify the item assign the null category.
 """
 
 
@@ -43,12 +43,44 @@ known financial items =
 
 Requirements: 
 - Map each unknown financial term to exactly one known financial item. 
-- Provide the result as a single json, only with unknown financial term as keys, and the known financial item name as value. Do not provide any explanations only the JSON result.
+- Give one mapping per unknown financial term with the term and the known financial item name.
 - Use the meaning item name and the meaning description to correctly map the financial term.
-- Try to classify all unknown financial terms. If it's absolutely not possible to classify a unknown financial term to any known item using it's description and meaning  assign the JSON null value.
+- Try to classify all unknown financial terms. If it's absolutely not possible to classify a unknown financial term to any known item using it's description and meaning  assign the null field.
 - Redefine the classification of nulls, and attempt to classify more terms.
 """
 
+classify_fields_to_candidates_prompt = """
+    Classify each unknown financial term listed between triple ticks to one of its candidate known financial items. The candidate known financial items of each term are given by name, their short descriptions are listed once below.
+
+unknown financial terms with their candidates =
+    ```{unknown_financial_terms_with_candidates} ```
+
+candidate known financial items =
+    ```{candidate_known_items} ```
+
+Requirements:
+- Map each unknown financial term to exactly one of its own candidate known financial item names.
+- Give one mapping per unknown financial term with the term and the known financial item name.
+- Use the meaning of the term, the item name and the short description to correctly map the financial term.
+- If none of the candidates matches the meaning of the unknown financial term assign the null field.
+"""
+
+
+classify_and_map_prompt = """
+    Classify each financial item listed between triple ticks into one of the categories {categories}, and map it to one of the known financial items of that category listed between triple asterisks.
+
+financial items, with their amount =
+    ```{financial_items} ```
+
+known financial items by category, as known item name: short description =
+    ***{known_financial_items_by_category}***
+
+Requirements:
+- For each financial item decide its category using firstly the meaning, the sign if available, and the items before and after, then map it to exactly one known financial item name of that category.
+- Give one entry per financial item with the item, its category and the known financial item name as its field.
+- Try to classify all of the financial items! If it is absolutely not possible to classify an item assign the null category, if none of the known financial items of its category matches assign the null field.
+"""
+
 
 pdf2json_omniai_prompt="""
 Convert the below PDF page into ONE JSON Object with the following properties :\n 
@@ -1,9 +1,13 @@
-from .conversion import PDFConversionDefaultOptions
+from .conversion import PDFConversionDefaultOptions, ImageInputOptions
+from .download import DownloadDefaultOptions, S3DownloadDefaultOptions
 from .messages import Messages
 from .prompts import Prompts
 
 __all__ = [
     "PDFConversionDefaultOptions",
+    "ImageInputOptions",
+    "DownloadDefaultOptions",
+    "S3DownloadDefaultOptions",
     "Messages",
     "Prompts",
 ]
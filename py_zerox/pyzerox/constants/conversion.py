@@ -6,3 +6,18 @@ class PDFConversionDefaultOptions:
     SIZE = (None, 1056)
     THREAD_COUNT = 4
     USE_PDFTOCAIRO = True
+
+
+class ImageInputOptions:
+    """Options for image inputs that bypass the PDF conversion"""
+
+    ## leading bytes of the supported image formats
+    SIGNATURES = {
+        b"\x89PNG\r\n\x1a\n": "png",
+        b"\xff\xd8\xff": "jpeg",
+        b"II*\x00": "tiff",
+        b"MM\x00*": "tiff",
+    }
+    ## formats the vision models accept as is, other formats (multi-frame tiff) are split into png pages
+    PASSTHROUGH_FORMATS = ("png", "jpeg")
+    PAGE_FORMAT = "png"
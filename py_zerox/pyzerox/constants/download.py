@@ -0,0 +1,16 @@
+class DownloadDefaultOptions:
+    """Default options for downloading remote files"""
+
+    CHUNK_SIZE = 1024 * 1024
+    CONNECTION_LIMIT = 100
+    CONNECTION_LIMIT_PER_HOST = 10
+    SOCKET_READ_TIMEOUT = 60
+
+
+class S3DownloadDefaultOptions:
+    """Default options for downloading objects from S3"""
+
+    MULTIPART_THRESHOLD = 16 * 1024 * 1024
+    PART_SIZE = 8 * 1024 * 1024
+    MAX_CONCURRENCY = 8
+    MAX_POOL_CONNECTIONS = 20
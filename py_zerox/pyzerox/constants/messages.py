@@ -23,6 +23,10 @@ class Messages:
     The maintain_format flag is set to True in conjunction with select_pages input given. This may result in unexpected behavior.
     """
 
+    KEEP_PAGE_CONTENT_WITHOUT_OUTPUT_DIR_WARNING = """
+    keep_page_content is set to False without an output_dir. The page content is kept in memory since there is no output file to read it back from.
+    """
+
     PAGE_NUMBER_OUT_OF_BOUND_ERROR = """
     The page number(s) provided is out of bound. Please provide a valid page number(s).
     """
@@ -47,6 +51,10 @@ class Messages:
     File not found or unreachable. Status Code: {0}
     """
 
+    S3_DEPENDENCY_MISSING = """
+    boto3 is required to read s3:// inputs. Install it with `pip install boto3`.
+    """
+
     FILE_PATH_MISSING = """
     File path is invalid or missing.
     """
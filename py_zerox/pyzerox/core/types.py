@@ -17,17 +17,36 @@ class ZeroxArgs:
     temp_dir: Optional[str] = None
     custom_system_prompt: Optional[str] = None
     select_pages: Optional[Union[int, Iterable[int]]] = None
+    keep_page_content: bool = True
     kwargs: Dict[str, Any] = field(default_factory=dict)
 
 @dataclass
 class Page:
     """
     Dataclass to store the page content.
+    content is None when the page content is not kept in memory, it can then be read back
+    from the output file with its byte offset and byte_length.
     """
 
-    content: str
+    content: Optional[str]
     content_length: int
     page: int
+    offset: Optional[int] = None
+    byte_length: Optional[int] = None
+
+
+@dataclass
+class PageResult:
+    """
+    Dataclass passed to the on_page callback of zerox as soon as a page completes.
+    completion_time is in milliseconds since the start of the zerox call, as in ZeroxOutput.
+    """
+
+    page: int
+    content: str
+    input_tokens: int
+    output_tokens: int
+    completion_time: float
 
 
 @dataclass
@@ -41,3 +60,4 @@ class ZeroxOutput:
     input_tokens: int
     output_tokens: int
     pages: List[Page]
+    output_path: Optional[str] = None
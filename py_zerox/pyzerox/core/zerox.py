@@ -2,25 +2,27 @@ import os
 import aioshutil as async_shutil
 import tempfile
 import warnings
-from typing import List, Optional, Union, Iterable
+from typing import Awaitable, Callable, Optional, Union, Iterable
 from datetime import datetime
-import aiofiles
 import aiofiles.os as async_os
 import asyncio
 from ..constants import PDFConversionDefaultOptions
 
 # Package Imports
 from ..processor import (
+    convert_image_to_pages,
     convert_pdf_to_images,
+    detect_image_format,
     download_file,
     process_page,
     process_pages_in_batches,
     create_selected_pages_pdf,
+    IncrementalMarkdownWriter,
 )
 from ..errors import FileUnavailable
 from ..constants.messages import Messages
 from ..models import litellmmodel
-from .types import Page, ZeroxOutput
+from .types import PageResult, ZeroxOutput
 
 
 async def zerox(
@@ -29,12 +31,16 @@ async def zerox(
     file_path: Optional[str] = "",
     image_density: int = PDFConversionDefaultOptions.DPI,
     image_height: tuple[Optional[int], int] = PDFConversionDefaultOptions.SIZE,
+    image_format: str = PDFConversionDefaultOptions.FORMAT,
     maintain_format: bool = False,
     model: str = "gpt-4o-mini",
     output_dir: Optional[str] = None,
     temp_dir: Optional[str] = None,
     custom_system_prompt: Optional[str] = None,
     select_pages: Optional[Union[int, Iterable[int]]] = None,
+    keep_page_content: bool = True,
+    on_page: Optional[Callable[[PageResult], Awaitable[None]]] = None,
+    page_images: Optional[Iterable[str]] = None,
     **kwargs
 ) -> ZeroxOutput:
     """
@@ -45,8 +51,14 @@ async def zerox(
     :type cleanup: bool, optional
     :param concurrency: The number of concurrent processes to run, defaults to 10
     :type concurrency: int, optional
-    :param file_path: The path or URL to the PDF file to process.
+    :param file_path: The path, URL or s3://bucket/key URI of the PDF or image (png, jpeg, multi-frame tiff) file to process.
     :type file_path: str, optional
+    :param image_density: The DPI used when rasterizing the PDF pages, defaults to 300
+    :type image_density: int, optional
+    :param image_height: The (width, height) size of the rasterized pages, defaults to (None, 1056)
+    :type image_height: tuple[Optional[int], int], optional
+    :param image_format: The image format used when rasterizing the PDF pages ("png" or "jpeg"), defaults to "png"
+    :type image_format: str, optional
     :param maintain_format: Whether to maintain the format from the previous page, defaults to False
     :type maintain_format: bool, optional
     :param model: The model to use for generating completions, defaults to "gpt-4o-mini". Note - Refer: https://docs.litellm.ai/docs/providers to pass correct model name as according to provider it might be different from actual name.
@@ -59,6 +71,12 @@ async def zerox(
     :type custom_system_prompt: str, optional
     :param select_pages: Pages to process, can be a single page number or an iterable of page numbers, defaults to None
     :type select_pages: int or Iterable[int], optional
+    :param keep_page_content: Whether to keep the page content in the returned pages. When False (requires output_dir) only the byte offset and length of each page in the output file are kept, so memory stays flat with the page count, defaults to True
+    :type keep_page_content: bool, optional
+    :param on_page: Coroutine function awaited with a PageResult as soon as each page completes, in completion order, e.g. to stream the pages, defaults to None
+    :type on_page: Callable[[PageResult], Awaitable[None]], optional
+    :param page_images: Paths of the page images already rendered from file_path, one per processed page in page order (only the select_pages ones when given). Relative paths are resolved against the working directory. The file is then neither downloaded nor converted, file_path only names the output, defaults to None
+    :type page_images: Iterable[str], optional
 
     :param kwargs: Additional keyword arguments to pass to the model.completion -> litellm.completion method. Refer: https://docs.litellm.ai/docs/providers and https://docs.litellm.ai/docs/completion/input
     :return: The markdown content generated by the model.
@@ -68,7 +86,6 @@ async def zerox(
     input_token_count = 0
     output_token_count = 0
     prior_page = ""
-    aggregated_markdown: List[str] = []
     start_time = datetime.now()
     
     # File Path Validators
@@ -82,6 +99,9 @@ async def zerox(
     if custom_system_prompt:
         vision_model.system_prompt = custom_system_prompt
 
+    if not keep_page_content and not output_dir:
+        warnings.warn(Messages.KEEP_PAGE_CONTENT_WITHOUT_OUTPUT_DIR_WARNING)
+
     # Check if both maintain_format and select_pages are provided
     if maintain_format and select_pages is not None:
         warnings.warn(Messages.MAINTAIN_FORMAT_SELECTED_PAGES_WARNING)
@@ -115,61 +135,89 @@ async def zerox(
             ## use the system temp directory
             temp_directory = temp_dir_
 
-        # Download the PDF. Get file name.
-        local_path = await download_file(file_path=file_path, temp_dir=temp_directory)
-        if not local_path:
-            raise FileUnavailable()
-        
+        if page_images is not None:
+            # Pages rendered ahead of time, e.g. by a speculative prefetch, skip the download and the conversion
+            local_path = file_path
+            # absolute, process_page joins the image paths onto the temp directory
+            images = [os.path.abspath(image) for image in page_images]
+        else:
+            # Download the PDF. Get file name.
+            local_path = await download_file(file_path=file_path, temp_dir=temp_directory)
+            if not local_path:
+                raise FileUnavailable()
+
         raw_file_name = os.path.splitext(os.path.basename(local_path))[0]
         file_name = "".join(c.lower() if c.isalnum() else "_" for c in raw_file_name)
         # Truncate file name to 255 characters to prevent ENAMETOOLONG errors
         file_name = file_name[:255]
 
-        # create a subset pdf in temp dir with only the requested pages if select_pages is provided
-        if select_pages is not None:
-            subset_pdf_create_kwargs = {"original_pdf_path":local_path, "select_pages":select_pages, 
-                                    "save_directory":temp_directory, "suffix":"_selected_pages"}
-            local_path = await asyncio.to_thread(create_selected_pages_pdf, 
-                                                 **subset_pdf_create_kwargs)
-
-        # Convert the file to a series of images, below function returns a list of image paths in page order
-        images = await convert_pdf_to_images(image_density=image_density, image_height=image_height, local_path=local_path, temp_dir=temp_directory)
-
-        if maintain_format:
-            for image in images:
-                result, input_token_count, output_token_count, prior_page = await process_page(
-                    image,
+        if page_images is None:
+            # Image inputs (png, jpeg, tiff) skip the PDF conversion, multi-frame images are split into pages
+            input_image_format = await asyncio.to_thread(detect_image_format, local_path)
+            if input_image_format:
+                images = await convert_image_to_pages(local_path=local_path, image_format=input_image_format,
+                                                      temp_dir=temp_directory, select_pages=select_pages)
+            else:
+                # create a subset pdf in temp dir with only the requested pages if select_pages is provided
+                if select_pages is not None:
+                    subset_pdf_create_kwargs = {"original_pdf_path":local_path, "select_pages":select_pages, 
+                                            "save_directory":temp_directory, "suffix":"_selected_pages"}
+                    local_path = await asyncio.to_thread(create_selected_pages_pdf, 
+                                                         **subset_pdf_create_kwargs)
+
+                # Convert the file to a series of images, below function returns a list of image paths in page order
+                images = await convert_pdf_to_images(image_density=image_density, image_height=image_height, local_path=local_path, temp_dir=temp_directory,
+                                                     image_format=image_format)
+
+        # Pages are appended to the output file in page order as they complete
+        result_file_path = os.path.join(output_dir, f"{file_name}.md") if output_dir else None
+        async with IncrementalMarkdownWriter(result_file_path, keep_content=keep_page_content) as writer:
+
+            async def report_page(index: int, content: str, input_tokens: int, output_tokens: int) -> None:
+                if on_page is None:
+                    return
+                page_number = select_pages[index] if select_pages is not None else index + 1
+                completion_time = (datetime.now() - start_time).total_seconds() * 1000
+                await on_page(PageResult(page=page_number, content=content, input_tokens=input_tokens,
+                                         output_tokens=output_tokens, completion_time=completion_time))
+
+            if maintain_format:
+                page_index = 0
+                for image_index, image in enumerate(images):
+                    prior_input_tokens, prior_output_tokens = input_token_count, output_token_count
+                    result, input_token_count, output_token_count, prior_page = await process_page(
+                        image,
+                        vision_model,
+                        temp_directory,
+                        input_token_count,
+                        output_token_count,
+                        prior_page,
+                    )
+
+                    if result:
+                        await writer.write_page(page_index, result)
+                        page_index += 1
+                        await report_page(image_index, result, input_token_count - prior_input_tokens,
+                                          output_token_count - prior_output_tokens)
+            else:
+                async def on_page_complete(index: int, result: tuple) -> None:
+                    await writer.write_page(index, result[0])
+                    await report_page(index, result[0], result[1], result[2])
+
+                results = await process_pages_in_batches(
+                    images,
+                    concurrency,
                     vision_model,
                     temp_directory,
                     input_token_count,
                     output_token_count,
                     prior_page,
+                    on_page_complete=on_page_complete,
                 )
 
-                if result:
-                    aggregated_markdown.append(result)
-        else:
-            results = await process_pages_in_batches(
-                images,
-                concurrency,
-                vision_model,
-                temp_directory,
-                input_token_count,
-                output_token_count,
-                prior_page,
-            )
-
-            aggregated_markdown = [result[0] for result in results if isinstance(result[0], str)]
-
-            ## add token usage
-            input_token_count += sum([result[1] for result in results])
-            output_token_count += sum([result[2] for result in results])
-
-        # Write the aggregated markdown to a file
-        if output_dir:
-            result_file_path = os.path.join(output_dir, f"{file_name}.md")
-            async with aiofiles.open(result_file_path, "w", encoding="utf-8") as f:
-                await f.write("\n\n".join(aggregated_markdown))
+                ## add token usage
+                input_token_count += sum([result[1] for result in results])
+                output_token_count += sum([result[2] for result in results])
 
         # Cleanup the downloaded PDF file
         if cleanup and os.path.exists(temp_directory):
@@ -180,18 +228,7 @@ async def zerox(
         completion_time = (end_time - start_time).total_seconds() * 1000
 
         # Adjusting the formatted_pages logic to account for select_pages to output the correct page numbers
-        if select_pages is not None:
-            # Map aggregated markdown to the selected pages
-            formatted_pages = [
-                        Page(content=content, page=select_pages[i], content_length=len(content))
-                        for i, content in enumerate(aggregated_markdown)
-                    ]
-        else:
-            # Default behavior when no select_pages is provided
-            formatted_pages = [
-                        Page(content=content, page=i + 1, content_length=len(content))
-                        for i, content in enumerate(aggregated_markdown)
-                    ]
+        formatted_pages = writer.pages(page_numbers=select_pages)
 
         return ZeroxOutput(
             completion_time=completion_time,
@@ -199,4 +236,5 @@ async def zerox(
             input_tokens=input_token_count,
             output_tokens=output_token_count,
             pages=formatted_pages,
+            output_path=result_file_path,
         )
\ No newline at end of file
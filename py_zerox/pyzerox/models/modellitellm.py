@@ -1,4 +1,5 @@
 import os
+import base64
 import aiohttp
 import warnings
 import litellm
@@ -10,7 +11,7 @@ from .types import CompletionResponse
 from ..errors import ModelAccessError, NotAVisionModel, MissingEnvironmentVariables
 from ..constants.messages import Messages
 from ..constants.prompts import Prompts
-from ..processor.image import encode_image_to_base64
+from ..processor.image import encode_image_to_base64, sniff_image_format
 
 DEFAULT_SYSTEM_PROMPT = Prompts.DEFAULT_SYSTEM_PROMPT
 
@@ -143,13 +144,16 @@ class litellmmodel(BaseModel):
 
         # Add Image to request
         base64_image = await encode_image_to_base64(image_path)
+        # the type is read from the image itself, the extension of a downloaded file may not match its content
+        image_format = sniff_image_format(base64.b64decode(base64_image[:12]))
+        mime_type = f"image/{image_format or 'png'}"
         messages.append(
             {
                 "role": "user",
                 "content": [
                     {
                         "type": "image_url",
-                        "image_url": {"url": f"data:image/png;base64,{base64_image}"},
+                        "image_url": {"url": f"data:{mime_type};base64,{base64_image}"},
                     },
                 ],
             }
@@ -1,19 +1,29 @@
-from .image import save_image, encode_image_to_base64
+from .image import save_image, encode_image_to_base64, detect_image_format, sniff_image_format, convert_image_to_pages
 from .pdf import (
     convert_pdf_to_images,
     process_page,
     process_pages_in_batches,
 )
 from .text import format_markdown
-from .utils import download_file, create_selected_pages_pdf
+from .writer import IncrementalMarkdownWriter, read_page_content
+from .s3 import get_s3_client, set_s3_client
+from .utils import download_file, create_selected_pages_pdf, close_http_session
 
 __all__ = [
     "save_image",
     "encode_image_to_base64",
+    "detect_image_format",
+    "sniff_image_format",
+    "convert_image_to_pages",
     "convert_pdf_to_images",
     "format_markdown",
     "download_file",
     "process_page",
     "process_pages_in_batches",
     "create_selected_pages_pdf",
+    "close_http_session",
+    "IncrementalMarkdownWriter",
+    "read_page_content",
+    "get_s3_client",
+    "set_s3_client",
 ]
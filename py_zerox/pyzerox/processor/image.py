@@ -1,6 +1,13 @@
 import aiofiles
+import asyncio
 import base64
 import io
+import os
+from typing import List, Optional
+
+# Package Imports
+from ..constants import ImageInputOptions
+from ..errors.exceptions import PageNumberOutOfBoundError
 
 
 async def encode_image_to_base64(image_path: str) -> str:
@@ -20,3 +27,65 @@ async def save_image(image, image_path: str):
     # Write image data to file asynchronously
     async with aiofiles.open(image_path, "wb") as f:
         await f.write(image_data)
+
+
+def detect_image_format(file_path: str) -> Optional[str]:
+    """Detects a supported image format ("png", "jpeg" or "tiff") from the file's leading bytes. Returns None for other files."""
+    with open(file_path, "rb") as f:
+        header = f.read(8)
+    return sniff_image_format(header)
+
+
+def sniff_image_format(header: bytes) -> Optional[str]:
+    """Detects a supported image format ("png", "jpeg" or "tiff") from leading bytes of an image. Returns None for other data."""
+    for signature, image_format in ImageInputOptions.SIGNATURES.items():
+        if header.startswith(signature):
+            return image_format
+    return None
+
+
+async def convert_image_to_pages(
+    local_path: str,
+    image_format: str,
+    temp_dir: str,
+    select_pages: Optional[List[int]] = None,
+) -> List[str]:
+    """
+    Prepares an image input as a list of page image paths, without going through the PDF conversion.
+    PNG and JPEG files are used as is, multi-frame (TIFF) files are split into one PNG per frame in the temp_dir.
+    """
+    if image_format in ImageInputOptions.PASSTHROUGH_FORMATS:
+        _validate_select_pages(select_pages, total_pages=1)
+        return [local_path]
+
+    return await asyncio.to_thread(_split_frames, local_path, temp_dir, select_pages)
+
+
+def _split_frames(local_path: str, temp_dir: str, select_pages: Optional[List[int]]) -> List[str]:
+    """Saves the (selected) frames of a multi-frame image as separate images. Returns the image paths in page order."""
+    from PIL import Image
+
+    file_name = os.path.splitext(os.path.basename(local_path))[0]
+    image_paths = []
+    with Image.open(local_path) as image:
+        total_pages = getattr(image, "n_frames", 1)
+        _validate_select_pages(select_pages, total_pages)
+        pages = select_pages if select_pages is not None else range(1, total_pages + 1)
+
+        for page in pages:
+            image.seek(page - 1)
+            frame = image.convert("RGB") if image.mode not in ("RGB", "L") else image.copy()
+            page_path = os.path.join(temp_dir, f"{file_name}-{page}.{ImageInputOptions.PAGE_FORMAT}")
+            frame.save(page_path, format=ImageInputOptions.PAGE_FORMAT)
+            image_paths.append(page_path)
+    return image_paths
+
+
+def _validate_select_pages(select_pages: Optional[List[int]], total_pages: int) -> None:
+    if select_pages is None:
+        return
+    invalid_page_numbers = [page for page in select_pages if page < 1 or page > total_pages]
+    if invalid_page_numbers:
+        raise PageNumberOutOfBoundError(extra_info={"input_image_num_pages": total_pages,
+                                                    "select_pages": select_pages,
+                                                    "invalid_page_numbers": invalid_page_numbers})
@@ -1,7 +1,7 @@
 import logging
 import os
 import asyncio
-from typing import List, Optional, Tuple
+from typing import Awaitable, Callable, List, Optional, Tuple
 from pdf2image import convert_from_path
 
 # Package Imports
@@ -11,13 +11,14 @@ from ..constants import PDFConversionDefaultOptions, Messages
 from ..models import litellmmodel
 
 
-async def convert_pdf_to_images(image_density: int, image_height: tuple[Optional[int], int], local_path: str, temp_dir: str) -> List[str]:
+async def convert_pdf_to_images(image_density: int, image_height: tuple[Optional[int], int], local_path: str, temp_dir: str,
+                                 image_format: str = PDFConversionDefaultOptions.FORMAT) -> List[str]:
     """Converts a PDF file to a series of images in the temp_dir. Returns a list of image paths in page order."""
     options = {
         "pdf_path": local_path,
         "output_folder": temp_dir,
         "dpi": image_density,
-        "fmt": PDFConversionDefaultOptions.FORMAT,
+        "fmt": image_format,
         "size": image_height,
         "thread_count": PDFConversionDefaultOptions.THREAD_COUNT,
         "use_pdftocairo": PDFConversionDefaultOptions.USE_PDFTOCAIRO,
@@ -86,13 +87,17 @@ async def process_pages_in_batches(
     input_token_count: int = 0,
     output_token_count: int = 0,
     prior_page: str = "",
+    on_page_complete: Optional[Callable[[int, Tuple[str, int, int, str]], Awaitable[None]]] = None,
 ):
+    """
+    Processes the pages concurrently. When on_page_complete is given, it is awaited with the page index and
+    result as soon as each page completes, and the page content is not kept in the returned results.
+    """
     # Create a semaphore to limit the number of concurrent tasks
     semaphore = asyncio.Semaphore(concurrency)
 
-    # Process each page in parallel
-    tasks = [
-        process_page(
+    async def process_and_report(index: int, image: str) -> Tuple[Optional[str], int, int, Optional[str]]:
+        result = await process_page(
             image,
             model,
             temp_directory,
@@ -101,8 +106,13 @@ async def process_pages_in_batches(
             prior_page,
             semaphore,
         )
-        for image in images
-    ]
+        if on_page_complete is None:
+            return result
+        await on_page_complete(index, result)
+        return None, result[1], result[2], None
+
+    # Process each page in parallel
+    tasks = [process_and_report(index, image) for index, image in enumerate(images)]
 
     # Wait for all tasks to complete
     return await asyncio.gather(*tasks)
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+from typing import Any, Optional, Tuple
+from urllib.parse import urlparse
+
+# Package Imports
+from ..constants import DownloadDefaultOptions, S3DownloadDefaultOptions, Messages
+from ..errors.exceptions import ResourceUnreachableException
+
+## shared s3 client, boto3 clients are thread safe and pool their connections
+_s3_client: Optional[Any] = None
+_s3_client_lock = threading.Lock()
+
+
+def get_s3_client() -> Any:
+    """
+    Returns the shared S3 client, creating it on first use.
+    Credentials, region and endpoint (AWS_ENDPOINT_URL_S3 / AWS_ENDPOINT_URL, e.g. a local S3 stand-in) come from the default boto3 chain.
+    """
+    global _s3_client
+
+    with _s3_client_lock:
+        if _s3_client is None:
+            try:
+                import boto3
+                from botocore.config import Config
+            except ImportError:
+                raise ImportError(Messages.S3_DEPENDENCY_MISSING)
+
+            config = Config(max_pool_connections=S3DownloadDefaultOptions.MAX_POOL_CONNECTIONS)
+            _s3_client = boto3.session.Session().client("s3", config=config)
+        return _s3_client
+
+
+def set_s3_client(client: Any) -> None:
+    """Overrides the shared S3 client, e.g. with an application wide pooled client or a client for a local S3 stand-in."""
+    global _s3_client
+
+    with _s3_client_lock:
+        _s3_client = client
+
+
+def is_s3_uri(string: str) -> bool:
+    """Checks if a string is an s3://bucket/key URI."""
+
+    try:
+        result = urlparse(string)
+        return result.scheme == "s3" and bool(result.netloc) and bool(result.path.lstrip("/"))
+    except ValueError:
+        return False
+
+
+def parse_s3_uri(uri: str) -> Tuple[str, str]:
+    """Splits an s3://bucket/key URI into its bucket and key."""
+
+    result = urlparse(uri)
+    return result.netloc, result.path.lstrip("/")
+
+
+async def download_s3_file(uri: str, local_path: str) -> str:
+    """
+    Downloads an S3 object to local_path, streaming it to disk in chunks.
+    Objects larger than the multipart threshold are fetched with concurrent ranged reads.
+    """
+    client = get_s3_client()
+    bucket, key = parse_s3_uri(uri)
+
+    try:
+        head = await asyncio.to_thread(client.head_object, Bucket=bucket, Key=key)
+    except Exception as err:
+        raise ResourceUnreachableException(extra_info={"uri": uri, "error": str(err)})
+
+    size = head["ContentLength"]
+    etag = head["ETag"]
+
+    if size <= S3DownloadDefaultOptions.MULTIPART_THRESHOLD:
+        await asyncio.to_thread(_download_range, client, bucket, key, etag, local_path, None)
+        return local_path
+
+    ## preallocate the file so that every part can be written at its own offset
+    with open(local_path, "wb") as f:
+        f.truncate(size)
+
+    semaphore = asyncio.Semaphore(S3DownloadDefaultOptions.MAX_CONCURRENCY)
+    part_size = S3DownloadDefaultOptions.PART_SIZE
+
+    async def download_part(start: int) -> None:
+        end = min(start + part_size, size) - 1
+        async with semaphore:
+            await asyncio.to_thread(_download_range, client, bucket, key, etag, local_path, (start, end))
+
+    await asyncio.gather(*[download_part(start) for start in range(0, size, part_size)])
+    return local_path
+
+
+def _download_range(
+    client: Any,
+    bucket: str,
+    key: str,
+    etag: str,
+    local_path: str,
+    byte_range: Optional[Tuple[int, int]],
+) -> None:
+    """Streams the whole object, or a byte range of it, into local_path at the matching offset."""
+
+    kwargs = {"Bucket": bucket, "Key": key, "IfMatch": etag}
+    if byte_range is not None:
+        kwargs["Range"] = f"bytes={byte_range[0]}-{byte_range[1]}"
+
+    try:
+        response = client.get_object(**kwargs)
+    except Exception as err:
+        raise ResourceUnreachableException(extra_info={"uri": f"s3://{bucket}/{key}", "error": str(err)})
+
+    offset = byte_range[0] if byte_range is not None else 0
+    mode = "r+b" if byte_range is not None else "wb"
+    with open(local_path, mode) as f:
+        f.seek(offset)
+        for chunk in response["Body"].iter_chunks(DownloadDefaultOptions.CHUNK_SIZE):
+            f.write(chunk)
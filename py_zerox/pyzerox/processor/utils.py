@@ -1,36 +1,89 @@
 import os
 import re
+import asyncio
 from typing import Optional, Union, Iterable
 from urllib.parse import urlparse
 import aiofiles
+import aiofiles.os as async_os
 import aiohttp
 from PyPDF2 import PdfReader, PdfWriter
+from ..constants import DownloadDefaultOptions
 from ..constants.messages import Messages
 
 # Package Imports
-from ..errors.exceptions import ResourceUnreachableException, PageNumberOutOfBoundError
+from .s3 import is_s3_uri, download_s3_file
+from ..errors.exceptions import ResourceUnreachableException, PageNumberOutOfBoundError, FileUnavailable
+
+## shared http session, reused across downloads for connection pooling
+_http_session: Optional[aiohttp.ClientSession] = None
+_http_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """Returns the shared aiohttp session, creating it on first use or when the running event loop changed."""
+    global _http_session, _http_session_loop
+
+    loop = asyncio.get_running_loop()
+    if _http_session is None or _http_session.closed or _http_session_loop is not loop:
+        connector = aiohttp.TCPConnector(
+            limit=DownloadDefaultOptions.CONNECTION_LIMIT,
+            limit_per_host=DownloadDefaultOptions.CONNECTION_LIMIT_PER_HOST,
+        )
+        timeout = aiohttp.ClientTimeout(sock_read=DownloadDefaultOptions.SOCKET_READ_TIMEOUT)
+        _http_session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        _http_session_loop = loop
+    return _http_session
+
+
+async def close_http_session() -> None:
+    """Closes the shared aiohttp session, if any."""
+    global _http_session, _http_session_loop
+
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+    _http_session_loop = None
 
 
 async def download_file(
     file_path: str,
     temp_dir: str,
 ) -> Optional[str]:
-    """Downloads a file from a URL or local path to a temporary directory."""
+    """
+    Downloads a file from a URL or an s3://bucket/key URI to a temporary directory, streaming it to disk in chunks.
+    Local files are hard-linked into the temporary directory, or used in place when linking is not possible.
+    """
 
     local_pdf_path = os.path.join(temp_dir, os.path.basename(file_path))
+    if is_s3_uri(file_path):
+        return await download_s3_file(file_path, local_pdf_path)
+
     if is_valid_url(file_path):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(file_path) as response:
-                if response.status != 200:
-                    raise ResourceUnreachableException()
-                async with aiofiles.open(local_pdf_path, "wb") as f:
-                    await f.write(await response.read())
-    else:
-        async with aiofiles.open(file_path, "rb") as src, aiofiles.open(
-            local_pdf_path, "wb"
-        ) as dst:
-            await dst.write(await src.read())
-    return local_pdf_path
+        session = await get_http_session()
+        async with session.get(file_path) as response:
+            if response.status != 200:
+                raise ResourceUnreachableException()
+            async with aiofiles.open(local_pdf_path, "wb") as f:
+                async for chunk in response.content.iter_chunked(DownloadDefaultOptions.CHUNK_SIZE):
+                    await f.write(chunk)
+        return local_pdf_path
+
+    return await link_local_file(file_path, local_pdf_path)
+
+
+async def link_local_file(file_path: str, local_path: str) -> str:
+    """Hard-links a local file to local_path. Falls back to the original path (no copy) if linking fails, e.g. across devices."""
+
+    if not os.path.isfile(file_path):
+        raise FileUnavailable(extra_info={"file_path": file_path})
+
+    try:
+        if os.path.lexists(local_path):
+            await async_os.remove(local_path)
+        await async_os.link(file_path, local_path)
+        return local_path
+    except OSError:
+        return os.path.abspath(file_path)
 
 
 def is_valid_url(string: str) -> bool:
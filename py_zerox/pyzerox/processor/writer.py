@@ -0,0 +1,81 @@
+import aiofiles
+from typing import Dict, List, Optional, Tuple
+
+# Package Imports
+from ..core.types import Page
+
+
+class IncrementalMarkdownWriter:
+    """
+    Appends page markdown to the output file in page order as pages complete.
+    Pages completing out of order are buffered until the pages before them are written.
+    With keep_content=False only the byte offset and length of each page are kept in memory.
+    """
+
+    SEPARATOR = "\n\n"
+
+    def __init__(self, file_path: Optional[str] = None, keep_content: bool = True):
+        self.file_path = file_path
+        ## without an output file the content is the only place the pages live
+        self.keep_content = keep_content or file_path is None
+        self._file = None
+        self._position = 0
+        self._next_index = 0
+        self._pending: Dict[int, str] = {}
+        self._contents: List[str] = []
+        self._lengths: List[int] = []
+        self._offsets: List[Tuple[int, int]] = []
+
+    async def __aenter__(self) -> "IncrementalMarkdownWriter":
+        if self.file_path:
+            self._file = await aiofiles.open(self.file_path, "wb")
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._file is not None:
+            await self._file.close()
+            self._file = None
+
+    async def write_page(self, index: int, content: str) -> None:
+        """Adds the content of the page at position index (0-based) and flushes every page that is now in order."""
+        self._pending[index] = content
+        while self._next_index in self._pending:
+            await self._append(self._pending.pop(self._next_index))
+            self._next_index += 1
+
+    async def _append(self, content: str) -> None:
+        data = content.encode("utf-8")
+        separator = self.SEPARATOR.encode("utf-8") if self._next_index > 0 else b""
+
+        if self._file is not None:
+            await self._file.write(separator + data)
+        self._position += len(separator)
+        self._offsets.append((self._position, len(data)))
+        self._position += len(data)
+
+        self._lengths.append(len(content))
+        if self.keep_content:
+            self._contents.append(content)
+
+    def pages(self, page_numbers: Optional[List[int]] = None) -> List[Page]:
+        """Returns the written pages, numbered with page_numbers if given, 1..n otherwise."""
+        pages = []
+        for i, (offset, byte_length) in enumerate(self._offsets):
+            pages.append(
+                Page(
+                    content=self._contents[i] if self.keep_content else None,
+                    content_length=self._lengths[i],
+                    page=page_numbers[i] if page_numbers is not None else i + 1,
+                    offset=offset if self.file_path else None,
+                    byte_length=byte_length if self.file_path else None,
+                )
+            )
+        return pages
+
+
+async def read_page_content(file_path: str, page: Page) -> str:
+    """Reads the content of a page back from the output file using its byte offset and length."""
+    async with aiofiles.open(file_path, "rb") as f:
+        await f.seek(page.offset)
+        data = await f.read(page.byte_length)
+    return data.decode("utf-8")
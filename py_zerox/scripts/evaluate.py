@@ -0,0 +1,242 @@
+# evaluate.py
+
+import argparse
+import asyncio
+import difflib
+import itertools
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+
+import litellm
+
+from pyzerox import zerox
+from pyzerox.constants import PDFConversionDefaultOptions
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+SHARED_DIR = os.path.join(ROOT_DIR, "shared")
+INPUT_DIR = os.path.join(SHARED_DIR, "inputs")
+REFERENCE_DIR = os.path.join(SHARED_DIR, "outputs")
+TEST_JSON_PATH = os.path.join(SHARED_DIR, "test.json")
+FILE_CONCURRENCY = 10
+
+
+@dataclass
+class EvalConfig:
+    """
+    A single zerox configuration to evaluate.
+    """
+
+    model: str
+    image_density: int
+    image_format: str
+    maintain_format: bool
+
+    @property
+    def name(self) -> str:
+        packing = "sequential" if self.maintain_format else "batched"
+        return f"{self.model}|{self.image_density}dpi|{self.image_format}|{packing}"
+
+
+@dataclass
+class FileResult:
+    """
+    Evaluation result of one input file under one configuration.
+    """
+
+    file: str
+    keywords_found: int = 0
+    keywords_total: int = 0
+    similarity: Optional[float] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    latency_ms: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class ConfigResult:
+    """
+    Aggregated evaluation result of one configuration over all input files.
+    """
+
+    config: str
+    keyword_recall: float = 0.0
+    similarity: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost: float = 0.0
+    latency_ms: float = 0.0
+    errors: int = 0
+    files: List[FileResult] = field(default_factory=list)
+
+
+def compare_keywords(pages: List[str], expected_keywords: List[List[str]]) -> tuple[int, int]:
+    """Counts the expected keywords found in each page (case insensitive). Returns (found, total)."""
+    found, total = 0, 0
+    for i, keywords in enumerate(expected_keywords):
+        page_content = pages[i].lower() if i < len(pages) else ""
+        total += len(keywords)
+        found += sum(1 for keyword in keywords if keyword.lower() in page_content)
+    return found, total
+
+
+def reference_similarity(markdown: str, file_name: str) -> Optional[float]:
+    """Similarity ratio between the extracted markdown and the reference markdown, if one exists."""
+    reference_path = os.path.join(REFERENCE_DIR, f"{os.path.splitext(file_name)[0]}.md")
+    if not os.path.exists(reference_path):
+        return None
+    with open(reference_path, "r", encoding="utf-8") as f:
+        reference = f.read()
+    return difflib.SequenceMatcher(None, markdown, reference, autojunk=False).ratio()
+
+
+def completion_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    """Cost in USD of the token usage according to the litellm price map, 0.0 if the model is unknown."""
+    try:
+        prompt_cost, completion_cost_ = litellm.cost_per_token(
+            model=model, prompt_tokens=input_tokens, completion_tokens=output_tokens
+        )
+        return prompt_cost + completion_cost_
+    except Exception:
+        return 0.0
+
+
+async def evaluate_file(config: EvalConfig, test_input: Dict, temp_dir: str, semaphore: asyncio.Semaphore) -> FileResult:
+    """Runs zerox on a single input file with the given configuration and scores the output."""
+    result = FileResult(file=test_input["file"])
+    file_path = os.path.join(INPUT_DIR, test_input["file"])
+    if not os.path.exists(file_path):
+        result.error = "file not found"
+        return result
+
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            output = await zerox(
+                file_path=file_path,
+                model=config.model,
+                image_density=config.image_density,
+                image_format=config.image_format,
+                maintain_format=config.maintain_format,
+                temp_dir=os.path.join(temp_dir, os.path.splitext(test_input["file"])[0]),
+            )
+        except Exception as err:
+            result.error = str(err).strip()
+            return result
+        result.latency_ms = (time.perf_counter() - start) * 1000
+
+    pages = [page.content for page in output.pages]
+    result.keywords_found, result.keywords_total = compare_keywords(pages, test_input["expectedKeywords"])
+    result.similarity = reference_similarity("\n\n".join(pages), test_input["file"])
+    result.input_tokens = output.input_tokens
+    result.output_tokens = output.output_tokens
+    return result
+
+
+async def evaluate_config(config: EvalConfig, test_inputs: List[Dict], temp_dir: str) -> ConfigResult:
+    """Evaluates a configuration over all the test inputs."""
+    semaphore = asyncio.Semaphore(FILE_CONCURRENCY)
+    files = await asyncio.gather(
+        *[evaluate_file(config, test_input, temp_dir, semaphore) for test_input in test_inputs]
+    )
+
+    scored = [f for f in files if f.error is None]
+    found = sum(f.keywords_found for f in scored)
+    total = sum(f.keywords_total for f in scored)
+    similarities = [f.similarity for f in scored if f.similarity is not None]
+    input_tokens = sum(f.input_tokens for f in scored)
+    output_tokens = sum(f.output_tokens for f in scored)
+
+    return ConfigResult(
+        config=config.name,
+        keyword_recall=found / total if total else 0.0,
+        similarity=sum(similarities) / len(similarities) if similarities else 0.0,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        cost=completion_cost(config.model, input_tokens, output_tokens),
+        latency_ms=sum(f.latency_ms for f in scored),
+        errors=len(files) - len(scored),
+        files=files,
+    )
+
+
+def select_fastest(results: List[ConfigResult], min_recall: float) -> Optional[ConfigResult]:
+    """Returns the lowest latency configuration whose keyword recall stays within the accuracy budget."""
+    eligible = [r for r in results if r.errors == 0 and r.keyword_recall >= min_recall]
+    return min(eligible, key=lambda r: r.latency_ms, default=None)
+
+
+def print_summary(results: List[ConfigResult], best: Optional[ConfigResult], min_recall: float) -> None:
+    header = f"{'configuration':<45} {'recall':>8} {'similar':>8} {'in_tok':>9} {'out_tok':>8} {'cost $':>8} {'latency s':>10} {'errors':>6}"
+    print("-" * len(header))
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r.config:<45} {r.keyword_recall:>8.2%} {r.similarity:>8.3f} {r.input_tokens:>9} "
+            f"{r.output_tokens:>8} {r.cost:>8.4f} {r.latency_ms / 1000:>10.2f} {r.errors:>6}"
+        )
+    print("-" * len(header))
+    if best:
+        print(f"Fastest configuration with keyword recall >= {min_recall:.0%}: {best.config}")
+    else:
+        print(f"No configuration reached keyword recall >= {min_recall:.0%} without errors")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Evaluate zerox configurations against shared/test.json keywords and shared/outputs references."
+    )
+    parser.add_argument("--model", nargs="+", default=["gpt-4o-mini"], help="Vision model(s) to evaluate")
+    parser.add_argument("--dpi", nargs="+", type=int, default=[PDFConversionDefaultOptions.DPI], help="Rasterization DPI(s)")
+    parser.add_argument("--format", nargs="+", default=[PDFConversionDefaultOptions.FORMAT], choices=["png", "jpeg"],
+                        help="Rasterization image format(s)")
+    parser.add_argument("--packing", nargs="+", default=["batched"], choices=["batched", "sequential"],
+                        help="batched: pages run concurrently; sequential: pages run one by one with maintain_format")
+    parser.add_argument("--files", nargs="+", default=None, help="Only evaluate these input files (e.g. 0001.png)")
+    parser.add_argument("--min-recall", type=float, default=0.9, help="Accuracy budget used to pick the fastest configuration")
+    parser.add_argument("--output-dir", default=os.path.join(ROOT_DIR, "py_zerox", "tests", "results", f"eval-{int(time.time())}"),
+                        help="Directory to write the evaluation results to")
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> List[ConfigResult]:
+    with open(TEST_JSON_PATH, "r", encoding="utf-8") as f:
+        test_inputs = json.load(f)
+    if args.files:
+        test_inputs = [t for t in test_inputs if t["file"] in args.files]
+
+    configs = [
+        EvalConfig(model=model, image_density=dpi, image_format=fmt, maintain_format=packing == "sequential")
+        for model, dpi, fmt, packing in itertools.product(args.model, args.dpi, args.format, args.packing)
+    ]
+
+    temp_dir = os.path.join(args.output_dir, "temp")
+    results = []
+    # configurations run one after the other so that their latencies are comparable
+    for config in configs:
+        print(f"Evaluating {config.name} on {len(test_inputs)} file(s)")
+        results.append(await evaluate_config(config, test_inputs, temp_dir))
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+    results = asyncio.run(run(args))
+    best = select_fastest(results, args.min_recall)
+
+    with open(os.path.join(args.output_dir, "output.json"), "w", encoding="utf-8") as f:
+        json.dump({"results": [asdict(r) for r in results], "fastest_within_budget": best.config if best else None},
+                  f, indent=2)
+
+    print_summary(results, best, args.min_recall)
+    print(f"Full evaluation results are available in {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
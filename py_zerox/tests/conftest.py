@@ -0,0 +1,28 @@
+import os
+
+import boto3
+import pytest
+from moto import mock_aws
+
+# litellm, imported with pyzerox, would otherwise fetch its model cost map over the network
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+BUCKET = "test-bucket"
+
+
+@pytest.fixture
+def aws_credentials(monkeypatch):
+    """Fake credentials and region, so that no test ever reaches a real AWS account."""
+    for name, value in {"AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing",
+                        "AWS_SESSION_TOKEN": "testing", "AWS_DEFAULT_REGION": "us-east-1"}.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv("AWS_PROFILE", raising=False)
+
+
+@pytest.fixture
+def s3(aws_credentials):
+    """An S3 client of a moto mocked account holding the empty BUCKET."""
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
@@ -0,0 +1,34 @@
+import pytest
+
+from catalog import CATALOGS
+from matcher import FieldMatcher
+
+
+@pytest.fixture(scope="module")
+def matchers():
+    return {statement: FieldMatcher(statement_catalog) for statement, statement_catalog in CATALOGS.items()}
+
+
+@pytest.mark.parametrize("statement, term, field", [
+    ("income", "Operating income", "ebit"),
+    ("income", "Revenues", "revenue"),
+    ("income", "Other revenues", "other_revenue"),
+    ("income", "Operating expenses total", "total_operating_expenses"),
+    ("balance", "Other non-current assets", "other_non_current_assets"),
+    ("balance", "Accounts receivables", "accounts_receivable"),
+])
+def test_match_resolves_known_terms(matchers, statement, term, field):
+    assert matchers[statement].match(term).field == field
+
+
+@pytest.mark.parametrize("statement, term", [
+    # a qualifier the field lacks, e.g. "operating income" scores 0.85 against "other operating income"
+    ("income", "Other operating income"),
+    ("income", "Non-operating income"),
+    ("income", "Net operating income"),
+    ("income", "Deferred revenues"),
+    # a qualifier of the field the term lacks
+    ("balance", "Other current assets"),
+])
+def test_match_leaves_qualified_terms_to_the_model(matchers, statement, term):
+    assert matchers[statement].match(term) is None
@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import importlib
+import os
+
+import pytest
+import requests
+from fastapi import HTTPException
+
+from conftest import BUCKET
+
+
+@pytest.fixture(scope="module")
+def app_module():
+    os.environ.setdefault("OPENAI_API_KEY", "testing")
+    return importlib.import_module("app")
+
+
+@pytest.fixture
+def api(app_module, s3, tmp_path, monkeypatch):
+    """The app on the mocked bucket, with an empty content index and job store."""
+    from content_index import ContentIndex
+    from jobs import JobQueue, JobStore
+    from s3_listing import ListingCache
+
+    monkeypatch.setattr(app_module.st, "S3_BUCKET_NAME", BUCKET)
+    monkeypatch.setattr(app_module, "s3_client", s3)
+    monkeypatch.setattr(app_module, "content_index", ContentIndex(str(tmp_path / "content_index.json")))
+    monkeypatch.setattr(app_module, "listing_cache", ListingCache(30, 16))
+    # the queue is not started, the tests run the queued jobs themselves
+    queue = JobQueue(JobStore(str(tmp_path / "jobs.sqlite3")), workers=1, handlers=app_module.job_queue.handlers)
+    monkeypatch.setattr(app_module, "job_queue", queue)
+    return app_module
+
+
+def run_job(api, job_id):
+    job = api.job_queue.store.get(job_id)
+    return asyncio.run(api.job_queue.handlers[job["kind"]](lambda **progress: None, **job["params"]))
+
+
+def presigned_upload(api, filename, body, sha256=None):
+    """Uploads body through the presigned PUT URL and completes it, returns the registration result."""
+    upload = asyncio.run(api.presign_upload(filename, len(body), "application/pdf", sha256))
+    assert upload["mode"] == "put"
+    response = requests.put(upload["url"], data=body, headers=upload["headers"])
+    assert response.status_code == 200
+    completion = asyncio.run(api.complete_upload(api.UploadCompletion(key=upload["key"])))
+    if "register_job_id" in completion:
+        # the object has no sha256 checksum, it is hashed by a register job
+        return run_job(api, completion["register_job_id"])
+    return completion
+
+
+def test_presign_put_register(api, s3):
+    body = b"%PDF-1.4 report"
+    sha256 = hashlib.sha256(body).hexdigest()
+
+    registered = presigned_upload(api, "report.pdf", body, sha256)
+
+    assert registered == {"s3_uri": f"s3://{BUCKET}/report.pdf", "sha256": sha256, "duplicate": False, "jobs": {}}
+    assert api.content_index.lookup(sha256)["size"] == len(body)
+    assert s3.get_object(Bucket=BUCKET, Key="report.pdf")["Body"].read() == body
+
+
+def test_presigned_copy_becomes_alias(api, s3):
+    body = b"%PDF-1.4 report"
+    presigned_upload(api, "report.pdf", body)
+
+    registered = presigned_upload(api, "copy.pdf", body)
+
+    assert registered["duplicate"] is True
+    assert registered["s3_uri"] == f"s3://{BUCKET}/report.pdf"
+    assert api.resolve_document(f"s3://{BUCKET}/copy.pdf") == (f"s3://{BUCKET}/report.pdf", registered["sha256"])
+    assert [obj["Key"] for obj in s3.list_objects_v2(Bucket=BUCKET)["Contents"]] == ["report.pdf"]
+
+
+def test_declared_sha256_is_not_trusted(api):
+    body = b"%PDF-1.4 report"
+    sha256 = hashlib.sha256(body).hexdigest()
+    presigned_upload(api, "report.pdf", body)
+
+    # claiming the digest of a stored document gets an upload URL, not an alias
+    upload = asyncio.run(api.presign_upload("evil.pdf", 5, "application/pdf", sha256))
+
+    assert "url" in upload
+    assert api.content_index.digest_of("evil.pdf") is None
+
+
+def test_presign_rejects_taken_and_invalid_names(api):
+    presigned_upload(api, "report.pdf", b"%PDF-1.4 report")
+
+    for filename, status_code in [("report.pdf", 409), ("..", 400), ("a*.pdf", 400)]:
+        with pytest.raises(HTTPException) as raised:
+            asyncio.run(api.presign_upload(filename, 5, "application/pdf", None))
+        assert raised.value.status_code == status_code
+    upload = asyncio.run(api.presign_upload("../../other/name.pdf", 5, "application/pdf", None))
+    assert upload["key"] == "name.pdf"
+
+
+def test_presign_multipart_complete_register(api, s3):
+    body = os.urandom(api.st.S3_PART_SIZE + 1024)
+    upload = asyncio.run(api.presign_upload("large.pdf", len(body), "application/pdf", None))
+    assert upload["mode"] == "multipart"
+
+    parts = []
+    for part in upload["parts"]:
+        start = (part["part_number"] - 1) * upload["part_size"]
+        response = requests.put(part["url"], data=body[start:start + upload["part_size"]])
+        parts.append({"part_number": part["part_number"], "etag": response.headers["ETag"]})
+    completion = asyncio.run(api.complete_upload(api.UploadCompletion(key="large.pdf", upload_id=upload["upload_id"],
+                                                                      parts=parts)))
+    registered = run_job(api, completion["register_job_id"])
+
+    assert registered["sha256"] == hashlib.sha256(body).hexdigest()
+    assert s3.get_object(Bucket=BUCKET, Key="large.pdf")["Body"].read() == body
+
+
+def test_stale_multipart_uploads_are_aborted(api, s3):
+    asyncio.run(api.presign_upload("abandoned.pdf", api.st.S3_PART_SIZE + 1, "application/pdf", None))
+
+    # moto reports every upload as initiated in 2010
+    assert api.abort_stale_uploads(s3, BUCKET, max_age=100 * 365 * 24 * 3600) == []
+    assert api.abort_stale_uploads(s3, BUCKET, max_age=0) == ["abandoned.pdf"]
+    assert "Uploads" not in s3.list_multipart_uploads(Bucket=BUCKET)
@@ -0,0 +1,89 @@
+import asyncio
+import os
+
+import pytest
+
+from pyzerox.constants import S3DownloadDefaultOptions
+from pyzerox.errors.exceptions import ResourceUnreachableException
+from pyzerox.processor import set_s3_client
+from pyzerox.processor.s3 import download_s3_file
+
+from conftest import BUCKET
+
+
+class RecordingClient:
+    """Forwards to an S3 client and records the get_object calls, optionally running a hook after head_object."""
+
+    def __init__(self, client, after_head=None):
+        self.client = client
+        self.after_head = after_head
+        self.gets = []
+
+    def head_object(self, **kwargs):
+        head = self.client.head_object(**kwargs)
+        if self.after_head is not None:
+            self.after_head()
+        return head
+
+    def get_object(self, **kwargs):
+        self.gets.append(kwargs)
+        return self.client.get_object(**kwargs)
+
+
+@pytest.fixture
+def small_parts(monkeypatch):
+    """Ranged downloads from 1 MiB on, in 256 KiB parts, so that the test objects stay small."""
+    monkeypatch.setattr(S3DownloadDefaultOptions, "MULTIPART_THRESHOLD", 1024 * 1024)
+    monkeypatch.setattr(S3DownloadDefaultOptions, "PART_SIZE", 256 * 1024)
+
+
+@pytest.fixture(autouse=True)
+def reset_client():
+    yield
+    set_s3_client(None)
+
+
+def test_download_small_object_in_one_request(s3, small_parts, tmp_path):
+    s3.put_object(Bucket=BUCKET, Key="small.pdf", Body=b"%PDF-1.4 small")
+    client = RecordingClient(s3)
+    set_s3_client(client)
+
+    local_path = asyncio.run(download_s3_file(f"s3://{BUCKET}/small.pdf", str(tmp_path / "small.pdf")))
+
+    assert open(local_path, "rb").read() == b"%PDF-1.4 small"
+    assert len(client.gets) == 1
+    assert "Range" not in client.gets[0]
+
+
+def test_download_large_object_in_ranges(s3, small_parts, tmp_path):
+    body = os.urandom(3 * 1024 * 1024 + 123)
+    s3.put_object(Bucket=BUCKET, Key="large.pdf", Body=body)
+    etag = s3.head_object(Bucket=BUCKET, Key="large.pdf")["ETag"]
+    client = RecordingClient(s3)
+    set_s3_client(client)
+
+    local_path = asyncio.run(download_s3_file(f"s3://{BUCKET}/large.pdf", str(tmp_path / "large.pdf")))
+
+    assert open(local_path, "rb").read() == body
+    part_size = S3DownloadDefaultOptions.PART_SIZE
+    assert sorted(get["Range"] for get in client.gets) == sorted(
+        f"bytes={start}-{min(start + part_size, len(body)) - 1}" for start in range(0, len(body), part_size))
+    # every part is read from the version of the object the head request saw
+    assert all(get["IfMatch"] == etag for get in client.gets)
+
+
+def test_download_fails_when_object_changes(s3, small_parts, tmp_path):
+    s3.put_object(Bucket=BUCKET, Key="changing.pdf", Body=os.urandom(2 * 1024 * 1024))
+    client = RecordingClient(s3, after_head=lambda: s3.put_object(Bucket=BUCKET, Key="changing.pdf",
+                                                                  Body=os.urandom(2 * 1024 * 1024)))
+    set_s3_client(client)
+
+    with pytest.raises(ResourceUnreachableException):
+        asyncio.run(download_s3_file(f"s3://{BUCKET}/changing.pdf", str(tmp_path / "changing.pdf")))
+
+
+def test_download_missing_object(s3, tmp_path):
+    set_s3_client(s3)
+
+    with pytest.raises(ResourceUnreachableException):
+        asyncio.run(download_s3_file(f"s3://{BUCKET}/missing.pdf", str(tmp_path / "missing.pdf")))
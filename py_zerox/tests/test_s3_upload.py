@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import io
+import os
+import threading
+import time
+
+import pytest
+from fastapi import UploadFile
+
+from s3_upload import upload_stream
+
+from conftest import BUCKET
+
+PART_SIZE = 8 * 1024 * 1024
+
+
+class FailingFile(io.BytesIO):
+    """A file whose reads fail once fail_after bytes were read, e.g. a client that disconnects mid-upload."""
+
+    def __init__(self, data, fail_after):
+        super().__init__(data)
+        self.fail_after = fail_after
+
+    def read(self, size=-1):
+        if self.tell() >= self.fail_after:
+            raise ConnectionResetError("client disconnected")
+        return super().read(size)
+
+
+class CountingClient:
+    """Forwards to an S3 client and records the most upload_part calls in flight at once."""
+
+    def __init__(self, client):
+        self.client = client
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def upload_part(self, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # slow enough for every part the upload lets through to overlap
+            time.sleep(0.2)
+            return self.client.upload_part(**kwargs)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def upload(s3, data, key, **kwargs):
+    file = UploadFile(file=data if isinstance(data, io.IOBase) else io.BytesIO(data), filename=key)
+    return asyncio.run(upload_stream(s3, file, BUCKET, key, "application/pdf", part_size=PART_SIZE,
+                                     concurrency=2, **kwargs))
+
+
+def test_upload_stream_multipart_round_trip(s3):
+    body = os.urandom(20 * 1024 * 1024)
+    digest = hashlib.sha256()
+
+    size, stored = upload(s3, body, "large.pdf", digest=digest)
+
+    assert (size, stored) == (len(body), True)
+    assert digest.hexdigest() == hashlib.sha256(body).hexdigest()
+    stored_object = s3.get_object(Bucket=BUCKET, Key="large.pdf")
+    assert stored_object["Body"].read() == body
+    assert stored_object["ContentType"] == "application/pdf"
+    # 8 + 8 + 4 MiB
+    assert stored_object["ETag"].strip('"').endswith("-3")
+
+
+def test_upload_stream_bounds_parts_in_flight(s3):
+    client = CountingClient(s3)
+    body = os.urandom(5 * PART_SIZE)
+
+    upload(client, body, "large.pdf")
+
+    assert client.max_in_flight == 2
+    assert s3.get_object(Bucket=BUCKET, Key="large.pdf")["Body"].read() == body
+
+
+def test_upload_stream_single_put(s3):
+    size, stored = upload(s3, b"%PDF-1.4 small", "small.pdf")
+
+    assert (size, stored) == (14, True)
+    assert s3.get_object(Bucket=BUCKET, Key="small.pdf")["Body"].read() == b"%PDF-1.4 small"
+
+
+def test_upload_stream_aborts_on_error(s3):
+    data = FailingFile(os.urandom(20 * 1024 * 1024), fail_after=2 * PART_SIZE)
+
+    with pytest.raises(ConnectionResetError):
+        upload(s3, data, "broken.pdf")
+
+    assert "Uploads" not in s3.list_multipart_uploads(Bucket=BUCKET)
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET)
+
+
+def test_upload_stream_skip_aborts(s3):
+    body = os.urandom(10 * 1024 * 1024)
+    seen = []
+
+    size, stored = upload(s3, body, "copy.pdf", skip=lambda sha256: seen.append(sha256) or True)
+
+    assert (size, stored) == (len(body), False)
+    assert seen == [hashlib.sha256(body).hexdigest()]
+    assert "Uploads" not in s3.list_multipart_uploads(Bucket=BUCKET)
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET)
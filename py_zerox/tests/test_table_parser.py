@@ -0,0 +1,27 @@
+import numpy as np
+
+import amounts
+import table_parser
+
+STATEMENT = """Income statement
+| Item | 2023 | 2022 |
+|---|---|---|
+| Revenue | {revenue} | 1,000,000 |
+| Costs | (4,567.5) | (3,210) |
+"""
+
+
+def test_parse_column_rejects_unicode_digits():
+    parsed = amounts.parse_column(["1,234,567¹", "١٢", "12.5"])
+
+    assert np.isnan(parsed.values[:2]).all()
+    assert parsed.confidence.tolist() == [0.0, 0.0, 1.0]
+
+
+def test_index_years_parses_plain_table():
+    assert table_parser.index_years(STATEMENT.format(revenue="1,234,567")) == [
+        {"2023": {"Revenue": 1234567.0, "Costs": -4567.5}}, {"2022": {"Revenue": 1000000.0, "Costs": -3210.0}}]
+
+
+def test_index_years_leaves_footnoted_amounts_to_the_model():
+    assert table_parser.index_years(STATEMENT.format(revenue="1,234,567¹")) is None
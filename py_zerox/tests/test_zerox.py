@@ -0,0 +1,39 @@
+import asyncio
+import importlib
+
+import pytest
+
+from pyzerox import zerox
+from pyzerox.models.types import CompletionResponse
+
+
+class StubModel:
+    """Stands in for litellmmodel: answers with the content of the page image it is given."""
+
+    def __init__(self, model, **kwargs):
+        self.system_prompt = None
+
+    async def completion(self, image_path, maintain_format, prior_page):
+        with open(image_path, "r") as f:
+            return CompletionResponse(content=f.read(), input_tokens=1, output_tokens=2)
+
+
+@pytest.fixture
+def stub_model(monkeypatch):
+    # the module, pyzerox.core re-exports the zerox function under the same name
+    monkeypatch.setattr(importlib.import_module("pyzerox.core.zerox"), "litellmmodel", StubModel)
+
+
+@pytest.mark.parametrize("maintain_format", [False, True])
+def test_zerox_page_images_relative_paths(stub_model, tmp_path, monkeypatch, maintain_format):
+    # prefetched pages are named relative to the working directory, e.g. files/prefetch/<sha256>/page_1.png
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "prefetch").mkdir()
+    for number in (1, 2):
+        (tmp_path / "prefetch" / f"page_{number}.png").write_text(f"# Page {number}")
+
+    result = asyncio.run(zerox(file_path="report.pdf", model="stub", maintain_format=maintain_format,
+                               page_images=["prefetch/page_1.png", "prefetch/page_2.png"]))
+
+    assert [page.content for page in result.pages] == ["# Page 1", "# Page 2"]
+    assert (result.input_tokens, result.output_tokens) == (2, 4)
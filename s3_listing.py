@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+
+class ListingCache:
+    """
+    Short-lived cache of the list_objects_v2 pages of a bucket, keyed by (prefix, continuation token, max keys).
+    Pages expire after ttl seconds, and the pages whose prefix covers a key are dropped as soon as we write that key.
+    At most max_pages pages are kept, the oldest are dropped first.
+    """
+
+    def __init__(self, ttl, max_pages):
+        self.ttl = ttl
+        self.max_pages = max_pages
+        self.pages = {}
+
+    def get(self, key):
+        entry = self.pages.get(key)
+        if entry is None:
+            return None
+        stored_at, page = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self.pages[key]
+            return None
+        return page
+
+    def put(self, key, page):
+        now = time.monotonic()
+        # expired pages nobody asked for again are dropped here, so the cache never outgrows the ttl window
+        for expired in [key for key, (stored_at, _) in self.pages.items() if now - stored_at > self.ttl]:
+            del self.pages[expired]
+        self.pages.pop(key, None)
+        self.pages[key] = (now, page)
+        # pages are stored in insertion order, the first ones are the oldest
+        while len(self.pages) > self.max_pages:
+            del self.pages[next(iter(self.pages))]
+
+    def invalidate(self, object_key):
+        """Drops the pages that may list object_key."""
+        for key in [key for key in self.pages if object_key.startswith(key[0])]:
+            del self.pages[key]
+
+
+async def list_page(client, cache, bucket, prefix="", continuation_token=None, max_keys=1000):
+    """
+    Returns one page of the objects of the bucket under prefix:
+    {"objects": [{"key", "size", "last_modified"}], "next_continuation_token": token or None}.
+    cache, a ListingCache, may be None to always list from S3.
+    """
+    cache_key = (prefix, continuation_token, max_keys)
+    page = cache.get(cache_key) if cache is not None else None
+    if page is not None:
+        return page
+    kwargs = {"Bucket": bucket, "Prefix": prefix, "MaxKeys": max_keys}
+    if continuation_token:
+        kwargs["ContinuationToken"] = continuation_token
+    response = await asyncio.to_thread(client.list_objects_v2, **kwargs)
+    page = {
+        "objects": [{"key": obj["Key"], "size": obj["Size"], "last_modified": obj["LastModified"].isoformat()}
+                    for obj in response.get("Contents", [])],
+        "next_continuation_token": response.get("NextContinuationToken") if response.get("IsTruncated") else None,
+    }
+    if cache is not None:
+        cache.put(cache_key, page)
+    return page
+
+
+async def iter_objects(client, bucket, prefix="", contains=None, max_keys=1000):
+    """
+    Yields every object of the bucket under prefix whose key contains contains, page after page.
+    The pages are not cached, a whole listing would otherwise be kept in memory.
+    """
+    token = None
+    while True:
+        page = await list_page(client, None, bucket, prefix, token, max_keys)
+        for obj in page["objects"]:
+            if not contains or contains in obj["key"]:
+                yield obj
+        token = page["next_continuation_token"]
+        if token is None:
+            return
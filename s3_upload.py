@@ -0,0 +1,136 @@
+import asyncio
+import base64
+import hashlib
+import math
+from datetime import datetime, timedelta, timezone
+
+
+async def read_part(file, part_size, digest=None):
+    """
+    Reads up to part_size bytes of an UploadFile, fewer only at the end of the file.
+    digest, a hashlib object, is updated with the part, off the event loop.
+    """
+    chunks, size = [], 0
+    while size < part_size:
+        chunk = await file.read(part_size - size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+    part = b"".join(chunks)
+    if digest is not None and part:
+        await asyncio.to_thread(digest.update, part)
+    return part
+
+
+async def upload_stream(client, file, bucket, key, content_type, part_size, concurrency, digest=None, skip=None):
+    """
+    Streams an UploadFile to S3 without reading it whole: a single put_object when it fits in one part,
+    otherwise a multipart upload of part_size parts, at most concurrency of them in flight and one more read ahead.
+    The blocking boto3 calls run in threads. A failed multipart upload is aborted, so no orphan parts are billed.
+
+    digest, a hashlib object, is updated with the content as it streams. skip, when given, is called with the
+    hex digest once the whole file was read, before the object is committed: when it returns True the upload
+    is dropped, the multipart upload aborted, e.g. for content that is already stored.
+    Returns (size, stored).
+    """
+    if skip is not None and digest is None:
+        digest = hashlib.sha256()
+    first = await read_part(file, part_size, digest)
+    if len(first) < part_size:
+        if skip is not None and skip(digest.hexdigest()):
+            return len(first), False
+        await asyncio.to_thread(client.put_object, Bucket=bucket, Key=key, Body=first, ContentType=content_type)
+        return len(first), True
+
+    upload = await asyncio.to_thread(client.create_multipart_upload, Bucket=bucket, Key=key, ContentType=content_type)
+    upload_id = upload["UploadId"]
+    slots = asyncio.Semaphore(concurrency)
+    tasks, size = [], 0
+
+    async def upload_part(number, body):
+        try:
+            response = await asyncio.to_thread(client.upload_part, Bucket=bucket, Key=key, UploadId=upload_id,
+                                               PartNumber=number, Body=body)
+            return {"PartNumber": number, "ETag": response["ETag"]}
+        finally:
+            slots.release()
+
+    try:
+        part = first
+        while part:
+            size += len(part)
+            # a part is only sent once a slot is free, the next one is read while it uploads
+            await slots.acquire()
+            tasks.append(asyncio.create_task(upload_part(len(tasks) + 1, part)))
+            part = await read_part(file, part_size, digest)
+        parts = await asyncio.gather(*tasks)
+        if skip is not None and skip(digest.hexdigest()):
+            await asyncio.to_thread(client.abort_multipart_upload, Bucket=bucket, Key=key, UploadId=upload_id)
+            return size, False
+        await asyncio.to_thread(client.complete_multipart_upload, Bucket=bucket, Key=key, UploadId=upload_id,
+                                MultipartUpload={"Parts": parts})
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.to_thread(client.abort_multipart_upload, Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+    return size, True
+
+
+def presign_put(client, bucket, key, content_type, expires, sha256=None):
+    """
+    A presigned PUT URL for a single request upload straight to S3. With sha256, the hex digest of the
+    content, S3 rejects any other content and records the checksum on the object.
+    Returns the URL and the headers the client has to send with it.
+    """
+    params = {"Bucket": bucket, "Key": key, "ContentType": content_type}
+    headers = {"Content-Type": content_type}
+    if sha256:
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        params["ChecksumSHA256"] = checksum
+        headers["x-amz-checksum-sha256"] = checksum
+    url = client.generate_presigned_url("put_object", Params=params, ExpiresIn=expires)
+    return {"url": url, "headers": headers}
+
+
+def presign_multipart(client, bucket, key, content_type, size, part_size, expires):
+    """
+    Starts a multipart upload and presigns the PUT URL of each of its part_size parts.
+    The client uploads the parts, keeps the ETag header of each response and completes the upload with them.
+    """
+    upload_id = client.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)["UploadId"]
+    parts = [{"part_number": number,
+              "url": client.generate_presigned_url(
+                  "upload_part", Params={"Bucket": bucket, "Key": key, "UploadId": upload_id, "PartNumber": number},
+                  ExpiresIn=expires)}
+             for number in range(1, math.ceil(size / part_size) + 1)]
+    return {"upload_id": upload_id, "part_size": part_size, "parts": parts}
+
+
+async def object_digest(client, bucket, key, chunk_size):
+    """The sha256 hex digest and size of an S3 object, streamed in chunks off the event loop."""
+    def digest():
+        sha256, size = hashlib.sha256(), 0
+        for chunk in client.get_object(Bucket=bucket, Key=key)["Body"].iter_chunks(chunk_size):
+            sha256.update(chunk)
+            size += len(chunk)
+        return sha256.hexdigest(), size
+
+    return await asyncio.to_thread(digest)
+
+
+def abort_stale_uploads(client, bucket, max_age):
+    """
+    Aborts the multipart uploads of the bucket started more than max_age seconds ago, e.g. presigned ones the
+    client never completed, whose parts would otherwise be billed forever. Returns the keys of the aborted uploads.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age)
+    aborted = []
+    for page in client.get_paginator("list_multipart_uploads").paginate(Bucket=bucket):
+        for upload in page.get("Uploads", []):
+            if upload["Initiated"] < cutoff:
+                client.abort_multipart_upload(Bucket=bucket, Key=upload["Key"], UploadId=upload["UploadId"])
+                aborted.append(upload["Key"])
+    return aborted
@@ -0,0 +1,89 @@
+from functools import lru_cache
+from typing import List, Literal, Optional
+from pydantic import BaseModel, create_model
+from langchain_core.utils.function_calling import convert_to_openai_tool
+import statics as st
+from catalog import CATALOGS
+
+# response schemas of the model calls. Structured outputs only accept fixed keys, so the year and item keyed
+# JSON the prompts used to ask for is returned as lists of entries and converted back with to_legacy()
+
+
+class YearAmount(BaseModel):
+    """The amount of one financial item in one year."""
+    year: str
+    item: str
+    amount: Optional[float]
+
+
+class YearIndexedStatement(BaseModel):
+    """The amounts of a financial statement, one entry per item and year."""
+    amounts: List[YearAmount]
+
+    def to_legacy(self):
+        """The [{year: {item: amount}}] list of the index year prompt."""
+        years = {}
+        for entry in self.amounts:
+            years.setdefault(entry.year, {})[entry.item] = entry.amount
+        return [{year: items} for year, items in years.items()]
+
+
+class ItemTypesBase(BaseModel):
+    def to_legacy(self):
+        """The [{item: category}] list of the type prompts."""
+        return [{entry.item: entry.category} for entry in self.types]
+
+
+class FieldMappingsBase(BaseModel):
+    def to_legacy(self):
+        """The {term: field} dict of the mapping prompts."""
+        return {entry.term: entry.field for entry in self.mappings}
+
+
+class ItemClassificationsBase(BaseModel):
+    def to_legacy(self):
+        """The {item: {"category": ..., "field": ...}} dict of the classify and map prompt."""
+        return {entry.item: {"category": entry.category, "field": entry.field} for entry in self.items}
+
+
+def _statement_categories(statement):
+    return st.INCOME_CATEGORIES if statement == 'income' else st.BALANCE_CATEGORIES
+
+
+def _enum(values):
+    return Optional[Literal[tuple(values)]] if values else Optional[str]
+
+
+def item_types_model(statement):
+    categories = _statement_categories(statement)
+    item_type = create_model("ItemType", item=(str, ...), category=(_enum(categories), ...))
+    return create_model("ItemTypes", __base__=ItemTypesBase, types=(List[item_type], ...))
+
+
+def field_mappings_model(statement, fin_type):
+    field_names = CATALOGS[statement].names(fin_type)
+    field_mapping = create_model("FieldMapping", term=(str, ...), field=(_enum(field_names), ...))
+    return create_model("FieldMappings", __base__=FieldMappingsBase, mappings=(List[field_mapping], ...))
+
+
+def item_classifications_model(statement):
+    categories = _statement_categories(statement)
+    field_names = [name for fin_type in categories.values() for name in CATALOGS[statement].names(fin_type)]
+    item_classification = create_model("ItemClassification", item=(str, ...), category=(_enum(categories), ...),
+                                       field=(_enum(field_names), ...))
+    return create_model("ItemClassifications", __base__=ItemClassificationsBase, items=(List[item_classification], ...))
+
+
+@lru_cache(maxsize=None)
+def response_format(schema):
+    """The strict json_schema response_format of the chat completions API for a response model."""
+    function = convert_to_openai_tool(schema, strict=True)["function"]
+    return {"type": "json_schema",
+            "json_schema": {"name": function["name"], "schema": function["parameters"], "strict": True}}
+
+
+# the response models of every statement, built once since the catalog they enumerate is immutable
+ITEM_TYPES = {statement: item_types_model(statement) for statement in CATALOGS}
+FIELD_MAPPINGS = {(statement, fin_type): field_mappings_model(statement, fin_type)
+                  for statement in CATALOGS for fin_type in _statement_categories(statement).values()}
+ITEM_CLASSIFICATIONS = {statement: item_classifications_model(statement) for statement in CATALOGS}
@@ -0,0 +1,43 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent computations: the first call of a key runs it, the calls of the same
+    key arriving while it is in flight wait for its result instead of running it again.
+    A caller that goes away does not cancel the computation the other callers wait for, the computation
+    is only cancelled once every caller went away.
+    """
+
+    def __init__(self):
+        self.in_flight = {}
+        # task -> number of callers waiting for it
+        self.waiters = {}
+        self.requests = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key, compute):
+        """Returns (result, shared), shared being whether the result was computed for an earlier caller."""
+        self.requests += 1
+        task = self.in_flight.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = asyncio.ensure_future(compute())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        self.waiters[task] = self.waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task), shared
+        finally:
+            self.waiters[task] -= 1
+            if not self.waiters[task]:
+                del self.waiters[task]
+                task.cancel()
+
+    def metrics(self):
+        return {"requests": self.requests, "executions": self.executions,
+                "coalesced": self.coalesced, "in_flight": len(self.in_flight)}
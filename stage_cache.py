@@ -0,0 +1,60 @@
+import hashlib
+import json
+import os
+import aiofiles
+import misc
+
+# bytes read at once when hashing files
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+async def file_digest(path):
+    """The sha256 hex digest of a file's content, read in chunks."""
+    digest = hashlib.sha256()
+    async with aiofiles.open(path, "rb") as f:
+        while chunk := await f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StageCache:
+    """
+    Content addressed cache of the pipeline stage outputs.
+
+    The output of a stage is stored as files/cache/<stage>/<key>.json, the key being the sha256 of
+    everything the stage output depends on: its input, prompts, model and schema. A re-run only
+    recomputes the stages whose key changed.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    @staticmethod
+    def key(*parts):
+        """The cache key of the JSON serializable parts a stage output depends on."""
+        payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, stage, key):
+        return os.path.join(self.root, stage, f"{key}.json")
+
+    async def get(self, stage, key):
+        """The cached output of the stage, None when it was never computed."""
+        path = self.path(stage, key)
+        if not os.path.exists(path):
+            return None
+        async with aiofiles.open(path, "r") as f:
+            return json.loads(await f.read())["output"]
+
+    async def put(self, stage, key, output):
+        # concurrent runs of the same stage may write the same entry
+        await misc.write_json_atomic(self.path(stage, key), {"stage": stage, "output": output})
+
+    async def cached(self, stage, key, compute):
+        """Returns (output, hit): the cached output of the stage, or the output of the compute coroutine function, then cached."""
+        output = await self.get(stage, key)
+        if output is not None:
+            return output, True
+        output = await compute()
+        await self.put(stage, key, output)
+        return output, False
@@ -0,0 +1,80 @@
+import typing
+from pydantic import BaseModel, ValidationError
+import income_rep_model as im
+import balance_rep_model as bm
+from catalog import CATALOGS
+
+STATEMENT_CLASSES = {'income': im.IncomeStatement, 'balance': bm.BalanceStatement}
+
+
+def _submodel(annotation):
+    """The BaseModel class of a nested statement part, e.g. COGS for the cogs field, None for plain amounts."""
+    for candidate in (annotation, *typing.get_args(annotation)):
+        if isinstance(candidate, type) and issubclass(candidate, BaseModel):
+            return candidate
+    return None
+
+
+def field_values(type_of_statement, items, mapping):
+    """
+    Sums the amounts of the items of one year per known field, e.g. "administrative expenses" and
+    "selling costs" both mapped to total_sg_and_a. Expenses are taken as positive amounts, as the
+    statement models subtract them: the model signs them as it deduces, table_parser.index_years as
+    they are printed, "(500)" or "500", and both must sum to the same field value.
+    """
+    fields = CATALOGS[type_of_statement].fields
+    values = {}
+    for label, amount in items.items():
+        field = mapping.get(label)
+        if field is None or amount is None or field not in fields:
+            continue
+        if fields[field].fin_type == 'expense':
+            amount = abs(amount)
+        values[field] = values.get(field, 0.0) + amount
+    return values
+
+
+def missing_fields(statement_class, values):
+    """The required amounts of the statement model and its nested parts that values does not provide."""
+    missing = []
+    for name, field_info in statement_class.model_fields.items():
+        submodel = _submodel(field_info.annotation)
+        if submodel is not None:
+            missing.extend(missing_fields(submodel, values))
+        elif field_info.is_required() and name not in values:
+            missing.append(name)
+    return missing
+
+
+def build_statement(statement_class, values):
+    """Fills the statement model and its nested parts with the field values; missing parts are built empty."""
+    kwargs = {}
+    for name, field_info in statement_class.model_fields.items():
+        submodel = _submodel(field_info.annotation)
+        if submodel is not None:
+            kwargs[name] = build_statement(submodel, values)
+        elif name in values:
+            kwargs[name] = values[name]
+    return statement_class(**kwargs)
+
+
+def build_statements(type_of_statement, year_indexed, mapping):
+    """
+    Populates one IncomeStatement or BalanceStatement per year of the year indexed statement.
+    Returns (statements, errors): the dumped models by year, and the reason a year could not be built,
+    e.g. the required fields, such as tax_expenses, that none of its items was mapped to.
+    """
+    statement_class = STATEMENT_CLASSES[type_of_statement]
+    statements, errors = {}, {}
+    for year_items in year_indexed:
+        for year, items in year_items.items():
+            values = field_values(type_of_statement, items, mapping)
+            missing = missing_fields(statement_class, values)
+            if missing:
+                errors[year] = f"No item was mapped to the required fields {', '.join(missing)}."
+                continue
+            try:
+                statements[year] = build_statement(statement_class, values).model_dump()
+            except ValidationError as e:
+                errors[year] = str(e)
+    return statements, errors
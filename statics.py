@@ -2,3 +2,52 @@ AUTHINFO_FILEPATH = "~/.authinfo"
 AWS_CREDS = "~/.aws/credentials"
 S3_BUCKET_NAME = "findocs-bucket"
 PROFILE = "ddtechu"
+# classification label returned by the type prompts -> fin_type of the known fields
+INCOME_CATEGORIES = {"expenses": "expense", "earnings": "earning"}
+BALANCE_CATEGORIES = {"asset": "asset", "liability": "liability", "equity": "equity"}
+# maximum number of concurrent LLM calls issued by a single request
+MAPPING_FANOUT = 3
+# learned label -> known field mappings, consulted before the LLM
+LABEL_MAPPING_STORE_PATH = "files/mappings/label_mappings.json"
+# candidate known fields attached to each unknown term in the mapping prompt, 0 sends the full catalog
+MAPPING_TOP_K = 5
+# terms whose best candidate scores below this are mapped against the full catalog
+MAPPING_MIN_CANDIDATE_SCORE = 0.3
+# chat model of the text calls, structured outputs (json_schema response_format) need gpt-4o or later
+TEXT_MODEL = "gpt-4o"
+# longest model answer the local JSON repair attempts to fix
+JSON_REPAIR_MAX_CHARS = 200_000
+# vision model of the pdf to markdown conversion
+VISION_MODEL = "gpt-4o"
+# content addressed outputs of the pipeline stages
+STAGE_CACHE_DIR = "files/cache"
+# part of every stage cache key, bump it when the local stage code changes its output
+PIPELINE_CACHE_VERSION = 1
+# background jobs: their SQLite store, the number of jobs run at once and the status polling period in seconds
+JOB_STORE_PATH = "files/jobs/jobs.sqlite3"
+JOB_WORKERS = 2
+JOB_POLL_INTERVAL = 0.5
+# S3 endpoint, None for AWS, e.g. "http://localhost:9000" for a local S3 stand-in
+S3_ENDPOINT_URL = None
+# uploads larger than one part are sent as a multipart upload of parts of this size (5 MiB minimum)
+S3_PART_SIZE = 8 * 1024 * 1024
+# parts of one upload sent at once
+S3_UPLOAD_CONCURRENCY = 4
+# connections pooled by the shared S3 client, enough for the parallel parts of several uploads
+S3_MAX_POOL_CONNECTIONS = 32
+# seconds a page of the bucket listing is served from cache, our own uploads invalidate it at once
+S3_LISTING_TTL = 30
+# listing pages kept in cache at most, up to 1000 keys each
+S3_LISTING_CACHE_PAGES = 256
+# sha256 of the uploaded documents -> stored object and aliases
+CONTENT_INDEX_PATH = "files/uploads/content_index.json"
+# page images, text layer and located statement pages of the documents prefetched at upload
+PREFETCH_DIR = "files/prefetch"
+# prefetch jobs start after every queued processing job, which run at priority 0
+PREFETCH_PRIORITY = 10
+# seconds the presigned upload URLs stay valid
+S3_PRESIGN_EXPIRY = 3600
+# multipart uploads started longer ago than this are aborted, their part URLs expired an hour before
+S3_MULTIPART_MAX_AGE = S3_PRESIGN_EXPIRY + 3600
+# seconds between two sweeps of the stale multipart uploads
+S3_MULTIPART_SWEEP_INTERVAL = 900
@@ -0,0 +1,131 @@
+import re
+import numpy as np
+import amounts
+
+# a header cell naming a fiscal year, e.g. "2023", "FY 2023", "31 Dec 2023" or "2023 €'000"
+YEAR_PATTERN = re.compile(r"(?<!\d)((?:19|20)\d{2})(?!\d)")
+SEPARATOR_CELL = re.compile(r"^:?-+:?$")
+# mean parse confidence of the non-empty amount cells for a table to be trusted
+MIN_CONFIDENCE = 0.9
+# the non-empty lines right above a table that make its title, e.g. "Income statement" and "(in € thousands)"
+TITLE_LINES = 2
+
+
+def split_row(line):
+    cells = line.strip().strip("|").split("|")
+    return [cell.strip() for cell in cells]
+
+
+def find_tables(markdown):
+    """
+    Returns the markdown tables of the text as (rows, title) pairs, rows being lists of cells without
+    the separator rows and title the last TITLE_LINES non-empty lines since the previous table.
+    """
+    tables, rows, text = [], [], []
+    for line in markdown.splitlines() + [""]:
+        if line.strip().startswith("|"):
+            cells = split_row(line)
+            if not all(SEPARATOR_CELL.match(cell) for cell in cells if cell):
+                rows.append(cells)
+        elif rows:
+            title = [line for line in text if line.strip()][-TITLE_LINES:]
+            tables.append((rows, "\n".join(title)))
+            rows, text = [], [line]
+        else:
+            text.append(line)
+    return tables
+
+
+def clean_label(cell):
+    return re.sub(r"[*_`]+", "", cell).strip().rstrip(":")
+
+
+def year_columns(rows):
+    """
+    Returns (header_index, {column: year}) of the first row naming at least one year, the first
+    column of each year wins, e.g. a "2023 Company" column after "2023 Group" is left out.
+    """
+    for index, row in enumerate(rows[:3]):
+        columns = {}
+        for column, cell in enumerate(row):
+            match = YEAR_PATTERN.search(cell)
+            if match and match.group(1) not in columns.values():
+                columns[column] = match.group(1)
+        if columns:
+            return index, columns
+    return None, {}
+
+
+def parse_table(rows, title=""):
+    """
+    Pivots one statement table into {year: {item: amount}}, amounts scaled by the scale named in the
+    title or header, e.g. "(in thousands)".
+    Returns (years, confidence), confidence being the mean parse confidence of the non-empty amount cells,
+    0 when the locale of the table is unknown and one of its amounts depends on it.
+    """
+    header_index, columns = year_columns(rows)
+    if not columns:
+        return None, 0.0
+    label_columns = [column for column in range(len(rows[header_index])) if column not in columns]
+    if not label_columns:
+        return None, 0.0
+    label_column = label_columns[0]
+
+    labels, cells = [], {column: [] for column in columns}
+    for row in rows[header_index + 1:]:
+        label = clean_label(row[label_column]) if label_column < len(row) else ""
+        row_cells = {column: row[column] if column < len(row) else "" for column in columns}
+        # rows without any amount are section headings, e.g. "Current assets"
+        if not label or not any(clean_label(cell) for cell in row_cells.values()):
+            continue
+        labels.append(label)
+        for column, cell in row_cells.items():
+            cells[column].append(cell)
+    if not labels:
+        return None, 0.0
+
+    # the whole table shares one locale and one scale
+    decimal, certain = amounts.detect_decimal([cell for column in cells.values() for cell in column])
+    scale = amounts.detect_scale(title, *(" ".join(row) for row in rows[:header_index + 1]))
+    years, confidences = {}, []
+    for column, year in columns.items():
+        parsed = amounts.parse_column(cells[column], decimal=decimal if certain else None, scale=scale)
+        if parsed.ambiguous.any():
+            # no cell of the table tells "12.345" from 12345, the model reads the locale from the context
+            return years, 0.0
+        filled = np.char.strip(np.asarray(cells[column], dtype=str)) != ""
+        confidences.append(parsed.confidence[filled])
+        items = {}
+        # a label repeated under another heading keeps its first amount
+        for label, amount in zip(labels, parsed.to_list()):
+            items.setdefault(label, amount)
+        years[year] = items
+    confidence = np.concatenate(confidences)
+    return years, float(confidence.mean()) if confidence.size else 0.0
+
+
+def index_years(body, header=None):
+    """
+    Locally transforms the markdown body of a statement into the list of {year: {item: amount}}
+    objects otherwise produced by the index_year_stmnt_prompt. A scale named in the header, e.g.
+    "in thousands", applies to tables that do not name their own.
+    Returns None when the body has no year indexed table or one of them does not parse confidently,
+    the caller then falls back to the model.
+
+    Unlike the prompt, which deduces the sign of the amounts, the amounts keep the sign they are
+    written with: an expense printed as "500" stays positive. statements.field_values takes expenses
+    as positive amounts either way, so both paths build the same statements.
+    """
+    indexed = {}
+    for rows, title in find_tables(body):
+        years, confidence = parse_table(rows, f"{title}\n{header or ''}")
+        if years is None:
+            continue
+        if confidence < MIN_CONFIDENCE:
+            return None
+        for year, items in years.items():
+            for label, amount in items.items():
+                indexed.setdefault(year, {}).setdefault(label, amount)
+    if not indexed:
+        return None
+    return [{year: items} for year, items in indexed.items()]